@@ -0,0 +1,88 @@
+import os
+import asyncio
+from functools import wraps, partial
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from . import views
+
+ASYNC_IO_WORKERS = int(os.getenv("ASYNC_IO_WORKERS", "32"))
+ASYNC_STREAM_CHUNK = int(os.getenv("ASYNC_STREAM_CHUNK", "100"))
+
+_executor = ThreadPoolExecutor(max_workers=max(1, ASYNC_IO_WORKERS), thread_name_prefix="async-io")
+
+async def offload(fn, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(_executor, partial(fn, *args, **kwargs))
+
+async def _aiter(parts, chunk=ASYNC_STREAM_CHUNK):
+    it = iter(parts)
+    while True:
+        batch = await offload(lambda: list(islice(it, max(1, chunk))))
+        if not batch:
+            return
+        for part in batch:
+            yield part
+
+def _async_stream(resp):
+    if isinstance(resp, StreamingHttpResponse) and not resp.is_async:
+        resp.streaming_content = _aiter(resp.streaming_content)
+    return resp
+
+def _authenticate(request):
+    req = Request(request, authenticators=[a() for a in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        return req.user, None, req
+    except exceptions.APIException as e:
+        return None, e, req
+
+def _denied(req, error):
+    error = error or exceptions.NotAuthenticated()
+    header = req.authenticators[0].authenticate_header(req) if req.authenticators else None
+    data = error.detail if isinstance(error.detail, (list, dict)) else {"detail": error.detail}
+    resp = JsonResponse(data, status=401 if header else 403, safe=False)
+    if header:
+        resp["WWW-Authenticate"] = header
+    return resp
+
+def async_api(authenticated=True):
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+            if authenticated:
+                user, error, req = await sync_to_async(_authenticate)(request)
+                if error is not None or not (user and user.is_authenticated):
+                    return _denied(req, error)
+                request.user = user
+            return _async_stream(await view(request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+@async_api(authenticated=False)
+async def health(request):
+    return JsonResponse({"ok": True})
+
+@async_api()
+async def eta(request):
+    return await offload(views.eta_response, request)
+
+@async_api()
+async def predictions(request):
+    return await offload(views.predictions_response, request)
+
+@async_api()
+async def schedule(request):
+    return await offload(views.schedule_response, request)
+
+@async_api()
+async def get_route_mapping(request):
+    return await offload(views.route_mapping_response, request)
+
+@async_api()
+async def passenger_predictions(request):
+    return await offload(views.passengers_response, request)
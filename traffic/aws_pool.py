@@ -0,0 +1,89 @@
+import os
+import time
+import threading
+import boto3
+from botocore.config import Config
+
+REGION = os.getenv("AWS_REGION", "us-east-1")
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50"))
+AWS_TCP_KEEPALIVE = os.getenv("AWS_TCP_KEEPALIVE", "1") == "1"
+
+_lock = threading.Lock()
+_local = threading.local()
+_sessions = {}
+_clients = {}
+
+def _config():
+    return Config(max_pool_connections=AWS_MAX_POOL_CONNECTIONS, tcp_keepalive=AWS_TCP_KEEPALIVE)
+
+def get_session(region=None):
+    region = region or REGION
+    with _lock:
+        s = _sessions.get(region)
+        if s is None:
+            s = boto3.session.Session(region_name=region)
+            _sessions[region] = s
+        return s
+
+def get_client(service, region=None):
+    key = (service, region or REGION)
+    c = _clients.get(key)
+    if c is not None:
+        return c
+    session = get_session(key[1])
+    with _lock:
+        c = _clients.get(key)
+        if c is None:
+            c = session.client(service, config=_config())
+            _clients[key] = c
+        return c
+
+def _thread_cache():
+    cache = getattr(_local, "cache", None)
+    if cache is None:
+        cache = _local.cache = {}
+    return cache
+
+def get_resource(service, region=None):
+    cache = _thread_cache()
+    key = ("resource", service, region or REGION)
+    r = cache.get(key)
+    if r is None:
+        session = get_session(key[2])
+        with _lock:
+            r = session.resource(service, config=_config())
+        cache[key] = r
+    return r
+
+def get_table(name, region=None):
+    cache = _thread_cache()
+    key = ("table", name, region or REGION)
+    t = cache.get(key)
+    if t is None:
+        t = get_resource("dynamodb", region).Table(name)
+        cache[key] = t
+    return t
+
+def reset():
+    with _lock:
+        _sessions.clear()
+        _clients.clear()
+    _local.cache = {}
+
+def measure(service="dynamodb", region=None, n=5):
+    region = region or REGION
+    t0 = time.perf_counter()
+    for _ in range(n):
+        boto3.session.Session(region_name=region).client(service)
+    construct = (time.perf_counter() - t0) / n
+    get_client(service, region)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        get_client(service, region)
+    pooled = (time.perf_counter() - t0) / n
+    return {
+        "service": service,
+        "region": region,
+        "construct_ms": round(construct * 1000, 3),
+        "pooled_ms": round(pooled * 1000, 5),
+    }
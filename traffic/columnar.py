@@ -0,0 +1,150 @@
+import os
+import json
+import shutil
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+KINDS = ("boarding", "landing", "loader")
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+def _source_info(paths):
+    out = {}
+    for kind, p in zip(KINDS, paths):
+        st = os.stat(p)
+        out[kind] = {"name": os.path.basename(p), "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+    return out
+
+def _save(path, arr):
+    tmp = path + ".tmp.npy"
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+def compile_snapshot(paths, frames, out_dir):
+    b, l, d = frames
+    if not b["timestamp"].is_unique:
+        raise ValueError("boarding timestamps must be unique to build a shared index")
+    b = b.sort_values("timestamp", kind="stable").reset_index(drop=True)
+    index = b["timestamp"]
+    unit = np.datetime_data(index.values.dtype)[0]
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    os.makedirs(out_dir, exist_ok=True)
+    _save(os.path.join(out_dir, "timestamp.npy"), index.values.view(np.int64))
+    columns = {}
+    for kind, df in zip(KINDS, (b, l, d)):
+        kind_dir = os.path.join(out_dir, kind)
+        shutil.rmtree(kind_dir, ignore_errors=True)
+        os.makedirs(kind_dir)
+        aligned = df.drop_duplicates("timestamp").set_index("timestamp").reindex(index)
+        names = [str(c) for c in aligned.columns]
+        for name, col in zip(names, aligned.columns):
+            _save(os.path.join(kind_dir, name + ".npy"), aligned[col].to_numpy(dtype=np.float32))
+        columns[kind] = names
+    manifest = {
+        "version": FORMAT_VERSION,
+        "unit": unit,
+        "rows": int(len(index)),
+        "columns": columns,
+        "sources": _source_info(paths),
+    }
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, manifest_path)
+    return manifest
+
+class Snapshot:
+    def __init__(self, path, manifest):
+        self.path = path
+        self.manifest = manifest
+        self.columns = manifest["columns"]
+        self.rows = manifest["rows"]
+        self._ts = None
+        self._cols = {}
+        self._frames = None
+
+    @property
+    def timestamps(self):
+        if self._ts is None:
+            raw = np.load(os.path.join(self.path, "timestamp.npy"), mmap_mode="r")
+            self._ts = raw.view("datetime64[%s]" % self.manifest["unit"])
+        return self._ts
+
+    def has(self, kind, route_id):
+        return str(route_id) in self.columns[kind]
+
+    def column(self, kind, route_id):
+        key = (kind, str(route_id))
+        col = self._cols.get(key)
+        if col is None:
+            col = np.load(os.path.join(self.path, kind, key[1] + ".npy"), mmap_mode="r")
+            self._cols[key] = col
+        return col
+
+    def frames(self):
+        if self._frames is None:
+            out = []
+            for kind in KINDS:
+                data = {"timestamp": pd.Series(self.timestamps)}
+                for name in self.columns[kind]:
+                    data[name] = self.column(kind, name).astype(np.float64)
+                out.append(pd.DataFrame(data))
+            self._frames = tuple(out)
+        return self._frames
+
+def open_snapshot(out_dir, paths):
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != FORMAT_VERSION:
+        return None
+    if manifest.get("sources") != _source_info(paths):
+        return None
+    return Snapshot(out_dir, manifest)
+
+def export_shared(frames):
+    b = frames[0]
+    ts = b["timestamp"].values
+    unit = np.datetime_data(ts.dtype)[0]
+    rows = len(ts)
+    columns = {kind: [str(c) for c in df.columns if c != "timestamp"] for kind, df in zip(KINDS, frames)}
+    size = rows * 8 * (1 + sum(len(c) for c in columns.values()))
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 8))
+    np.ndarray(rows, dtype=np.int64, buffer=shm.buf)[:] = ts.view(np.int64)
+    offset = rows * 8
+    for kind, df in zip(KINDS, frames):
+        if not np.array_equal(df["timestamp"].values, ts):
+            shm.close()
+            shm.unlink()
+            raise ValueError("frames must share one timestamp index to be exported")
+        block = np.ndarray((rows, len(columns[kind])), dtype=np.float64, buffer=shm.buf, offset=offset)
+        block[:] = df.drop(columns="timestamp").to_numpy(dtype=np.float64)
+        offset += block.nbytes
+    meta = {"name": shm.name, "unit": unit, "rows": rows, "columns": columns}
+    return shm, meta
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+def attach_shared(meta):
+    shm = _attach(meta["name"])
+    rows = meta["rows"]
+    ts = np.ndarray(rows, dtype=np.int64, buffer=shm.buf).view("datetime64[%s]" % meta["unit"])
+    offset = rows * 8
+    frames = []
+    for kind in KINDS:
+        names = meta["columns"][kind]
+        block = np.ndarray((rows, len(names)), dtype=np.float64, buffer=shm.buf, offset=offset)
+        offset += block.nbytes
+        df = pd.DataFrame(block, columns=names, copy=False)
+        df.insert(0, "timestamp", ts)
+        frames.append(df)
+    return shm, tuple(frames)
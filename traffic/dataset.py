@@ -0,0 +1,78 @@
+import os
+import threading
+
+class DatasetCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _signature(self, paths):
+        sig = []
+        for p in paths:
+            st = os.stat(p)
+            sig.append((p, st.st_mtime_ns, st.st_size))
+        return tuple(sig)
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.RLock()
+            return lock
+
+    def _hit(self, key, sig):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == sig:
+                self.hits += 1
+                return True, entry[1]
+            return False, entry
+
+    def get(self, key, paths, loader):
+        sig = self._signature(paths)
+        hit, value = self._hit(key, sig)
+        if hit:
+            return value
+        with self._key_lock(key):
+            hit, entry = self._hit(key, sig)
+            if hit:
+                return entry
+            with self._lock:
+                if entry:
+                    self.reloads += 1
+                else:
+                    self.misses += 1
+            value = loader(paths)
+            with self._lock:
+                self._entries[key] = (sig, value)
+            return value
+
+    def prime(self, key, paths, value):
+        sig = self._signature(paths)
+        with self._lock:
+            self._entries[key] = (sig, value)
+
+    def peek(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses + self.reloads
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self._entries),
+        }
+
+dataset_cache = DatasetCache()
@@ -1,47 +1,280 @@
 import os
-import boto3
+import time
+import logging
+import random
+from itertools import islice
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
 from boto3.dynamodb.conditions import Key
+from .aws_pool import get_resource, get_table
+from .read_cache import read_cache
 
 REGION = os.getenv("AWS_REGION", "us-east-1")
 T_SNAP = os.getenv("DYNAMODB_TABLE_SNAPSHOTS", "TransitTrafficSnapshots")
 T_PRED = os.getenv("DYNAMODB_TABLE_PREDICTIONS", "TransitPredictions")
 T_SCHD = os.getenv("DYNAMODB_TABLE_SCHEDULES", "TransitSchedules")
 T_HIST = os.getenv("DYNAMODB_TABLE_ROUTE_HISTORY", "TransitRouteHistory")
+BATCH_SIZE = 25
+GET_BATCH_SIZE = 100
+WRITE_RETRIES = int(os.getenv("DYNAMODB_WRITE_RETRIES", "5"))
+WRITE_CONCURRENCY = int(os.getenv("DYNAMODB_WRITE_CONCURRENCY", "4"))
+READ_CONCURRENCY = int(os.getenv("DYNAMODB_READ_CONCURRENCY", "8"))
+DYNAMODB_POOL_WORKERS = int(os.getenv("DYNAMODB_POOL_WORKERS", "16"))
+RETRYABLE_ERRORS = {"ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded"}
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=max(1, DYNAMODB_POOL_WORKERS), thread_name_prefix="dynamo")
+
+def _throttled(e):
+    return e.response.get("Error", {}).get("Code") in RETRYABLE_ERRORS
+
+def _fan_out(fn, items, workers):
+    items = list(items)
+    workers = max(1, min(int(workers), len(items)))
+    if workers == 1:
+        return [fn(x) for x in items]
+    out = [None] * len(items)
+    def lane(start):
+        for k in range(start, len(items), workers):
+            out[k] = fn(items[k])
+    list(_executor.map(lane, range(workers)))
+    return out
 
 class DynamoRepo:
-    def __init__(self, dynamo=None):
-        self.d = dynamo or boto3.resource("dynamodb", region_name=REGION)
-        self.t_snap = self.d.Table(T_SNAP)
-        self.t_pred = self.d.Table(T_PRED)
-        self.t_schd = self.d.Table(T_SCHD)
-        self.t_hist = self.d.Table(T_HIST)
+    def __init__(self, dynamo=None, cache=None):
+        self._dynamo = dynamo
+        self.cache = read_cache if cache is None else cache
+        self._tables = {name: dynamo.Table(name) for name in (T_SNAP, T_PRED, T_SCHD, T_HIST)} if dynamo else None
+
+    @property
+    def d(self):
+        return self._dynamo or get_resource("dynamodb", REGION)
+
+    def _table(self, name):
+        return self._tables[name] if self._tables is not None else get_table(name, REGION)
+
+    @property
+    def t_snap(self):
+        return self._table(T_SNAP)
+
+    @property
+    def t_pred(self):
+        return self._table(T_PRED)
+
+    @property
+    def t_schd(self):
+        return self._table(T_SCHD)
+
+    @property
+    def t_hist(self):
+        return self._table(T_HIST)
+
+    def _write_batch(self, table, chunk, retries):
+        pending = {table.name: [{"PutRequest": {"Item": it}} for it in chunk]}
+        backoff = 0.05
+        for attempt in range(retries + 1):
+            try:
+                r = self.d.batch_write_item(RequestItems=pending)
+            except ClientError as e:
+                if not _throttled(e):
+                    logger.error("batch_write_item on %s failed: %r", table.name, e)
+                    raise
+                r = {"UnprocessedItems": pending}
+            pending = r.get("UnprocessedItems") or {}
+            if not pending:
+                return len(chunk), 0
+            if attempt < retries:
+                time.sleep(random.uniform(0, backoff))
+                backoff = min(backoff * 2, 2.0)
+        failed = len(pending.get(table.name, []))
+        return len(chunk) - failed, failed
+
+    def _batch_write(self, table, items, concurrency=None, retries=WRITE_RETRIES):
+        items = list(items)
+        chunks = [items[i:i + BATCH_SIZE] for i in range(0, len(items), BATCH_SIZE)]
+        results = _fan_out(lambda c: self._write_batch(table, c, retries), chunks, concurrency or WRITE_CONCURRENCY)
+        return {
+            "written": sum(r[0] for r in results),
+            "failed": sum(r[1] for r in results),
+            "batches": len(chunks),
+        }
+
+    def _get_batch(self, table, keys, fields, retries):
+        req = {"Keys": keys}
+        if fields:
+            names = {f"#p{i}": f for i, f in enumerate(fields)}
+            req.update(ProjectionExpression=", ".join(names), ExpressionAttributeNames=names)
+        pending = {table.name: req}
+        items = []
+        backoff = 0.05
+        for attempt in range(retries + 1):
+            try:
+                r = self.d.batch_get_item(RequestItems=pending)
+            except ClientError as e:
+                if not _throttled(e):
+                    logger.error("batch_get_item on %s failed: %r", table.name, e)
+                    raise
+                r = {"UnprocessedKeys": pending}
+            items.extend(r.get("Responses", {}).get(table.name, []))
+            pending = r.get("UnprocessedKeys") or {}
+            if not pending:
+                break
+            if attempt < retries:
+                time.sleep(random.uniform(0, backoff))
+                backoff = min(backoff * 2, 2.0)
+        return items
+
+    def _batch_get(self, table, keys, fields=None, concurrency=None, retries=WRITE_RETRIES):
+        keys = list(keys)
+        chunks = [keys[i:i + GET_BATCH_SIZE] for i in range(0, len(keys), GET_BATCH_SIZE)]
+        results = _fan_out(lambda c: self._get_batch(table, c, fields, retries), chunks, concurrency or READ_CONCURRENCY)
+        return [it for r in results for it in r]
+
+    def _invalidate(self, items):
+        if not self.cache:
+            return
+        for rid in {str(it.get("route_id")) for it in items}:
+            self.cache.invalidate(rid)
+
+    def _cached(self, method, route_id, args, loader):
+        if not self.cache:
+            return loader()
+        return self.cache.get_or_load(method, route_id, args, loader)
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache else {}
+
+    def iter_route_items(self, table, route_id, start=None, end=None, fields=None, page_size=None,
+                         newest_first=True, stats=None):
+        cond = Key("route_id").eq(route_id)
+        if start and end:
+            cond = cond & Key("timestamp_iso").between(start, end)
+        elif start:
+            cond = cond & Key("timestamp_iso").gte(start)
+        elif end:
+            cond = cond & Key("timestamp_iso").lte(end)
+        kw = {"KeyConditionExpression": cond, "ScanIndexForward": not newest_first, "ReturnConsumedCapacity": "TOTAL"}
+        if page_size:
+            kw["Limit"] = int(page_size)
+        if fields:
+            names = {f"#p{i}": f for i, f in enumerate(fields)}
+            kw["ProjectionExpression"] = ", ".join(names)
+            kw["ExpressionAttributeNames"] = names
+        while True:
+            r = table.query(**kw)
+            if stats is not None:
+                stats["pages"] = stats.get("pages", 0) + 1
+                stats["consumed_capacity"] = stats.get("consumed_capacity", 0.0) + float(r.get("ConsumedCapacity", {}).get("CapacityUnits", 0) or 0)
+            for it in r.get("Items", []):
+                yield it
+            lek = r.get("LastEvaluatedKey")
+            if not lek:
+                return
+            kw["ExclusiveStartKey"] = lek
+
+    def _query_route(self, table, route_id, limit, start=None, end=None, fields=None, stats=None):
+        items = self.iter_route_items(table, route_id, start, end, fields, page_size=limit, stats=stats)
+        return list(islice(items, limit)) if limit else list(items)
+
+    def iter_snapshots_by_route(self, route_id, start=None, end=None, fields=None, page_size=None, stats=None):
+        return self.iter_route_items(self.t_snap, route_id, start, end, fields, page_size, stats=stats)
+
+    def iter_predictions_by_route(self, route_id, start=None, end=None, fields=None, page_size=None, stats=None):
+        return self.iter_route_items(self.t_pred, route_id, start, end, fields, page_size, stats=stats)
 
     def put_snapshot(self, item):
         self.t_snap.put_item(Item=item)
+        self._invalidate([item])
+
+    def put_snapshots_bulk(self, items, concurrency=None):
+        items = list(items)
+        res = self._batch_write(self.t_snap, items, concurrency)
+        self._invalidate(items)
+        return res
 
-    def get_snapshots_by_route(self, route_id, limit=100):
-        r = self.t_snap.query(KeyConditionExpression=Key("route_id").eq(route_id), Limit=limit, ScanIndexForward=False)
-        return r.get("Items", [])
+    def get_snapshots_by_route(self, route_id, limit=100, start=None, end=None, fields=None, stats=None):
+        load = lambda: self._query_route(self.t_snap, route_id, limit, start, end, fields, stats)
+        return self._cached("get_snapshots_by_route", route_id, (limit, start, end, fields and ",".join(fields)), load)
 
     def put_prediction(self, item):
         self.t_pred.put_item(Item=item)
+        self._invalidate([item])
 
-    def get_predictions_by_route(self, route_id, limit=60):
-        r = self.t_pred.query(KeyConditionExpression=Key("route_id").eq(route_id), Limit=limit, ScanIndexForward=False)
-        return r.get("Items", [])
+    def put_predictions_bulk(self, items, concurrency=None):
+        items = list(items)
+        res = self._batch_write(self.t_pred, items, concurrency)
+        self._invalidate(items)
+        return res
+
+    def get_predictions_by_route(self, route_id, limit=60, start=None, end=None, fields=None, stats=None):
+        load = lambda: self._query_route(self.t_pred, route_id, limit, start, end, fields, stats)
+        return self._cached("get_predictions_by_route", route_id, (limit, start, end, fields and ",".join(fields)), load)
 
     def put_schedule(self, item):
         self.t_schd.put_item(Item=item)
+        self._invalidate([item])
 
     def get_latest_schedule(self, route_id):
-        r = self.t_schd.query(KeyConditionExpression=Key("route_id").eq(route_id), Limit=1, ScanIndexForward=False)
-        it = r.get("Items", [])
-        return it[0] if it else None
+        def load():
+            r = self.t_schd.query(KeyConditionExpression=Key("route_id").eq(route_id), Limit=1, ScanIndexForward=False)
+            it = r.get("Items", [])
+            return it[0] if it else None
+        return self._cached("get_latest_schedule", route_id, (), load)
 
     def append_history(self, item):
         self.t_hist.put_item(Item=item)
+        self._invalidate([item])
+
+    def append_history_bulk(self, items, concurrency=None):
+        items = list(items)
+        res = self._batch_write(self.t_hist, items, concurrency)
+        self._invalidate(items)
+        return res
 
     def get_latest_route_mapping(self, route_id):
-        r = self.t_hist.query(KeyConditionExpression=Key("route_id").eq(route_id), Limit=1, ScanIndexForward=False)
-        it = r.get("Items", [])
-        return it[0] if it else None
+        def load():
+            r = self.t_hist.query(KeyConditionExpression=Key("route_id").eq(route_id), Limit=1, ScanIndexForward=False)
+            it = r.get("Items", [])
+            return it[0] if it else None
+        return self._cached("get_latest_route_mapping", route_id, (), load)
+
+    def get_routes_overview(self, route_ids, window=60, concurrency=None):
+        route_ids = list(dict.fromkeys(str(r) for r in route_ids))
+        workers = concurrency or READ_CONCURRENCY
+        latest = lambda rid: (self.get_latest_schedule(rid), self.get_latest_route_mapping(rid))
+        heads = dict(zip(route_ids, _fan_out(latest, route_ids, workers)))
+        keys, starts = [], {}
+        for rid, (sched, _) in heads.items():
+            ts = sched and sched.get("timestamp_iso")
+            try:
+                start = datetime.fromisoformat(ts)
+            except (TypeError, ValueError):
+                continue
+            starts[rid] = ts
+            keys.extend({"route_id": rid, "timestamp_iso": (start + timedelta(minutes=i)).isoformat()} for i in range(window))
+        missing = [rid for rid in route_ids if rid not in starts]
+        queried = dict(zip(missing, _fan_out(lambda rid: self.get_predictions_by_route(rid, limit=window), missing, workers)))
+        fields = ["route_id", "timestamp_iso", "predicted_delay_sec", "model_version"]
+        found = self._batch_get(self.t_pred, keys, fields, concurrency)
+        preds = {rid: {} for rid in route_ids}
+        for it in found:
+            preds[str(it["route_id"])][it["timestamp_iso"]] = it
+        for rid, items in queried.items():
+            preds[rid] = {it["timestamp_iso"]: it for it in items}
+        out = {}
+        for rid in route_ids:
+            sched, mapping = heads[rid]
+            rows = [preds[rid][k] for k in sorted(preds[rid])]
+            out[rid] = {
+                "schedule": sched and {k: sched.get(k) for k in ("timestamp_iso", "departures_minutes", "fitness")},
+                "mapping": mapping and {k: mapping.get(k) for k in ("timestamp_iso", "origin", "destination")},
+                "predictions": {
+                    "start": starts.get(rid) or (rows[0]["timestamp_iso"] if rows else None),
+                    "model_version": rows[-1].get("model_version") if rows else None,
+                    "timestamps": [r["timestamp_iso"] for r in rows],
+                    "delays_sec": [r.get("predicted_delay_sec") for r in rows],
+                },
+            }
+        return out
@@ -0,0 +1,88 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+
+ETA_CACHE_TTL_S = float(os.getenv("ETA_CACHE_TTL_S", "30"))
+ETA_CACHE_MAX_ENTRIES = int(os.getenv("ETA_CACHE_MAX_ENTRIES", "1024"))
+ETA_CACHE_COORD_DECIMALS = int(os.getenv("ETA_CACHE_COORD_DECIMALS", "3"))
+
+_COORD = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+def normalize(place, decimals=ETA_CACHE_COORD_DECIMALS):
+    m = _COORD.match(place or "")
+    if m and decimals >= 0:
+        lat, lng = (round(float(v), decimals) for v in m.groups())
+        return f"{lat:.{decimals}f},{lng:.{decimals}f}"
+    return " ".join((place or "").lower().split())
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class EtaCache:
+    def __init__(self, ttl=ETA_CACHE_TTL_S, max_entries=ETA_CACHE_MAX_ENTRIES, decimals=ETA_CACHE_COORD_DECIMALS):
+        self.ttl = float(ttl)
+        self.max_entries = max(1, int(max_entries))
+        self.decimals = decimals
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._stats = {"hits": 0, "misses": 0, "collapsed": 0}
+
+    def key(self, origin, destination):
+        return normalize(origin, self.decimals), normalize(destination, self.decimals)
+
+    def get_or_fetch(self, origin, destination, fetch):
+        key = self.key(origin, destination)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1], now - entry[0]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats["misses"] += 1
+            else:
+                self._stats["collapsed"] += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, 0.0
+        try:
+            flight.value = fetch()
+            if flight.value is not None and self.ttl > 0:
+                self._store(key, flight.value)
+            return flight.value, 0.0
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+eta_cache = EtaCache()
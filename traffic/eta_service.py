@@ -0,0 +1,73 @@
+import os
+import logging
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from .dynamo_repo import DynamoRepo
+from .google_maps_client import GoogleMapsClient
+from .eta_cache import eta_cache
+
+ETA_SNAPSHOT_MAX_AGE_S = float(os.getenv("ETA_SNAPSHOT_MAX_AGE_S", "900"))
+ETA_REFRESH_AFTER_S = float(os.getenv("ETA_REFRESH_AFTER_S", "60"))
+ETA_REFRESH_WORKERS = int(os.getenv("ETA_REFRESH_WORKERS", "2"))
+
+logger = logging.getLogger(__name__)
+_executor = ThreadPoolExecutor(max_workers=max(1, ETA_REFRESH_WORKERS), thread_name_prefix="eta-refresh")
+_pending = set()
+_lock = threading.Lock()
+
+def _age(snapshot, now):
+    try:
+        ts = datetime.fromisoformat(snapshot["timestamp_iso"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return max(0.0, (now - ts).total_seconds())
+
+def _refresh(route_id, origin, destination):
+    try:
+        eta, _ = eta_cache.get_or_fetch(origin, destination, lambda: GoogleMapsClient().get_route_eta(origin, destination))
+        if eta:
+            DynamoRepo().put_snapshot(eta.snapshot_item(route_id, datetime.now(timezone.utc).isoformat()))
+    except Exception as e:
+        logger.warning("eta refresh for route %s failed: %r", route_id, e)
+    finally:
+        with _lock:
+            _pending.discard(route_id)
+
+def schedule_refresh(route_id, origin, destination):
+    with _lock:
+        if route_id in _pending:
+            return False
+        _pending.add(route_id)
+    _executor.submit(_refresh, route_id, origin, destination)
+    return True
+
+def latest_eta(route_id, repo=None, max_age_s=ETA_SNAPSHOT_MAX_AGE_S):
+    route_id = str(route_id)
+    repo = repo or DynamoRepo()
+    mapping = repo.get_latest_route_mapping(route_id)
+    if not mapping or not mapping.get("origin") or not mapping.get("destination"):
+        return None
+    origin, destination = mapping["origin"], mapping["destination"]
+    snaps = repo.get_snapshots_by_route(route_id, limit=1)
+    age = _age(snaps[0], datetime.now(timezone.utc)) if snaps else None
+    refreshing = False
+    if age is None or age > ETA_REFRESH_AFTER_S:
+        refreshing = schedule_refresh(route_id, origin, destination) or route_id in _pending
+    out = {"route_id": route_id, "origin": origin, "destination": destination, "refreshing": refreshing}
+    if age is None or age > max_age_s:
+        return dict(out, available=False, age_s=None if age is None else round(age, 1))
+    s = snaps[0]
+    return dict(
+        out,
+        available=True,
+        distance_m=int(s.get("distance_m", 0)),
+        duration_s=int(s.get("duration_s", 0)),
+        duration_in_traffic_s=int(s.get("duration_in_traffic_s", 0)),
+        source="snapshot",
+        timestamp_iso=s["timestamp_iso"],
+        age_s=round(age, 1),
+        stale=age > ETA_REFRESH_AFTER_S,
+    )
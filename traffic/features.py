@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+FEATURES = ["hour", "weekday", "month", "signal_lag1", "signal_lag2", "signal_roll3", "landing", "loader"]
+COLUMNS = ["timestamp", "signal", "landing", "loader"] + FEATURES[:3] + ["signal_lag1", "signal_lag2", "signal_roll3", "mix"]
+
+def _aligned(df, index, routes):
+    data = df.set_index("timestamp").reindex(index)
+    first = data.columns[0]
+    cols = [r if r in data.columns else first for r in routes]
+    return data[cols].to_numpy(dtype=np.float64)
+
+def _fill(a):
+    a[np.isnan(a)] = 0.0
+    return a
+
+def _lag(a, k):
+    out = np.zeros_like(a)
+    out[k:] = a[:-k]
+    return out
+
+class FleetFeatures:
+    def __init__(self, frames):
+        b, l, d = frames
+        for df in (b, l, d):
+            if not df["timestamp"].is_unique:
+                raise ValueError("fleet features need unique timestamps")
+        b = b.sort_values("timestamp").reset_index(drop=True)
+        ts = b["timestamp"]
+        self.routes = [str(c) for c in b.columns if c != "timestamp"]
+        self._pos = {r: i for i, r in enumerate(self.routes)}
+        self.timestamps = ts
+        self.signal = _fill(b[self.routes].to_numpy(dtype=np.float64))
+        self.landing = _fill(_aligned(l, ts.values, self.routes))
+        self.loader = _fill(_aligned(d, ts.values, self.routes))
+        self.hour = ts.dt.hour.to_numpy()
+        self.weekday = ts.dt.weekday.to_numpy()
+        self.month = ts.dt.month.to_numpy()
+        self.lag1 = _lag(self.signal, 1)
+        self.lag2 = _lag(self.signal, 2)
+        self.roll3 = pd.DataFrame(self.signal).rolling(3).mean().fillna(0).to_numpy()
+        self.mix = self.roll3 + 0.5 * self.landing + 0.3 * self.loader
+        T, R = self.signal.shape
+        self._X = np.empty((R, T, len(FEATURES)), dtype=np.float64)
+        self._X[:, :, 0] = self.hour
+        self._X[:, :, 1] = self.weekday
+        self._X[:, :, 2] = self.month
+        for k, a in enumerate((self.lag1, self.lag2, self.roll3, self.landing, self.loader), start=3):
+            self._X[:, :, k] = a.T
+        self._y = np.ascontiguousarray((self.mix * 10.0).T)
+
+    def has(self, route_id):
+        return str(route_id) in self._pos
+
+    def matrix(self, route_id):
+        return self._X[self._pos[str(route_id)]]
+
+    def target(self, route_id):
+        return self._y[self._pos[str(route_id)]]
+
+    def with_tail(self, route_id, ts, signal, landing, loader):
+        i = self._pos[str(route_id)]
+        ts = pd.DatetimeIndex(ts)
+        n = len(ts)
+        s = np.concatenate([np.zeros(2), self.signal[-2:, i], np.asarray(signal, dtype=np.float64)])[-(n + 2):]
+        landing = np.nan_to_num(np.asarray(landing, dtype=np.float64))
+        loader = np.nan_to_num(np.asarray(loader, dtype=np.float64))
+        roll3 = (s[:-2] + s[1:-1] + s[2:]) / 3.0
+        if len(self.signal) < 2:
+            roll3[:2 - len(self.signal)] = 0.0
+        X = np.empty((n, len(FEATURES)), dtype=np.float64)
+        X[:, 0] = ts.hour
+        X[:, 1] = ts.weekday
+        X[:, 2] = ts.month
+        X[:, 3] = s[1:-1]
+        X[:, 4] = s[:-2]
+        X[:, 5] = roll3
+        X[:, 6] = landing
+        X[:, 7] = loader
+        y = (roll3 + 0.5 * landing + 0.3 * loader) * 10.0
+        return np.concatenate([self.matrix(route_id), X]), np.concatenate([self.target(route_id), y])
+
+    def frame(self, route_id):
+        i = self._pos[str(route_id)]
+        return pd.DataFrame({
+            "timestamp": self.timestamps,
+            "signal": self.signal[:, i],
+            "landing": self.landing[:, i],
+            "loader": self.loader[:, i],
+            "hour": self.hour,
+            "weekday": self.weekday,
+            "month": self.month,
+            "signal_lag1": self.lag1[:, i],
+            "signal_lag2": self.lag2[:, i],
+            "signal_roll3": self.roll3[:, i],
+            "mix": self.mix[:, i],
+        }, columns=COLUMNS)
@@ -1,13 +1,221 @@
+import os
+import time
+from datetime import datetime, timezone
 import numpy as np
 
-def optimize_schedule(num_buses: int, window_minutes: int, predicted_delays):
-    n = max(1, int(num_buses))
+GA_POPULATION = int(os.getenv("GA_POPULATION", "64"))
+GA_GENERATIONS = int(os.getenv("GA_GENERATIONS", "150"))
+GA_TIME_BUDGET_S = float(os.getenv("GA_TIME_BUDGET_S", "0.5"))
+GA_MIN_HEADWAY = int(os.getenv("GA_MIN_HEADWAY", "1"))
+GA_FLEET_TIME_BUDGET_S = float(os.getenv("GA_FLEET_TIME_BUDGET_S", "30"))
+GA_TOLERANCE = float(os.getenv("GA_TOLERANCE", "1e-4"))
+GA_PATIENCE = int(os.getenv("GA_PATIENCE", "15"))
+
+def _baseline(n, w):
+    return np.arange(n) * w // n
+
+def _weights(predicted_delays, w):
+    d = np.clip(np.asarray(predicted_delays, dtype=float)[:w], 0.0, None)
+    if d.size == 0:
+        d = np.zeros(1)
+    if d.size < w:
+        d = np.concatenate([d, np.full(w - d.size, d.mean())])
+    return d + 0.25 * d.mean() + 1e-6
+
+def _elapsed_minutes(previous, now):
+    if now is None or not isinstance(previous, dict):
+        return 0
+    try:
+        ts = datetime.fromisoformat(previous["timestamp_iso"])
+    except (KeyError, TypeError, ValueError):
+        return 0
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=timezone.utc)
+    return max(0, int((now - ts).total_seconds() // 60))
+
+def _previous_departures(previous, n, w, now=None):
+    if previous is None:
+        return None
+    shift = _elapsed_minutes(previous, now)
+    if isinstance(previous, dict):
+        previous = previous.get("departures_minutes")
+    try:
+        prev = np.array(sorted(int(x) for x in previous or []), dtype=int) - shift
+    except (TypeError, ValueError):
+        return None
+    prev = prev[(prev >= 0) & (prev < w)]
+    if prev.size == 0:
+        return None
+    if prev.size > n:
+        prev = prev[np.linspace(0, prev.size - 1, n).astype(int)]
+    elif prev.size < n:
+        prev = np.concatenate([prev, _baseline(n, w)[prev.size - n:]])
+    return np.sort(prev)
+
+def _repair(pop, active, w):
+    pop = np.where(active, np.clip(pop, 0, w - 1), 10 * w)
+    pop = np.sort(pop, axis=-1)
+    return np.where(active, pop, pop[..., :1] + w)
+
+def _waits(pop, w):
+    shape, N = pop.shape[:-1], pop.shape[-1]
+    pop = pop.reshape(-1, N)
+    B = pop.shape[0]
+    ext = np.concatenate([pop, pop[:, :1] + w], axis=1)
+    nxt = np.full((B, 2 * w), 2 * w, dtype=pop.dtype)
+    nxt[np.arange(B)[:, None], ext] = ext
+    nxt = np.minimum.accumulate(nxt[:, ::-1], axis=1)[:, ::-1]
+    return (nxt[:, :w] - np.arange(w)).reshape(shape + (w,))
+
+def _fitness(pop, w, weights, n, active, min_headway):
+    wait = (_waits(pop, w) * weights).sum(axis=-1) / weights.sum(axis=-1)
+    fit = 1.0 / (1.0 + wait / (w / (2.0 * n)))
+    if min_headway > 1:
+        gaps = np.diff(np.concatenate([pop, pop[..., :1] + w], axis=-1), axis=-1)
+        fit = fit / (1.0 + 4.0 * ((gaps < min_headway) & active).sum(axis=-1))
+    return fit
+
+def _select(fit, rng, k=3):
+    P, R = fit.shape
+    idx = rng.integers(0, P, size=(k, P, R))
+    cand = fit[idx, np.arange(R)]
+    return np.take_along_axis(idx, cand.argmax(axis=0)[None], axis=0)[0]
+
+def _breed(pop, fit, active, w, step, rng, elite=2, p_cross=0.9, p_mut=0.2):
+    P, R, N = pop.shape
+    r = np.arange(R)
+    a = pop[_select(fit, rng), r]
+    b = pop[_select(fit, rng), r]
+    mask = rng.random((P, R, N)) < 0.5
+    cross = rng.random((P, R, 1)) < p_cross
+    child = np.where(mask & cross, a, b)
+    mut = rng.random((P, R, N)) < p_mut
+    child = child + mut * rng.integers(-step, step + 1, size=(P, R, N))
+    child = _repair(child, active, w)
+    best = np.argsort(-fit, axis=0)[:elite]
+    child[:elite] = pop[best, r]
+    return child
+
+def _initial_population(n, w, size, rng, seeds=None):
+    N = int(n.max())
+    active = np.arange(N)[None, :] < n[:, None]
+    base = np.zeros((n.size, N), dtype=int)
+    for i, k in enumerate(n):
+        base[i, :k] = _baseline(int(k), w)
+    step = np.maximum(1, w // (2 * n))[:, None]
+    jitter = rng.integers(-step, step + 1, size=(size, n.size, N))
+    pop = base[None] + jitter
+    half = size // 2
+    pop[half:] = rng.integers(0, w, size=(size - half, n.size, N))
+    pop[0] = base
+    if seeds is not None:
+        warm = base.copy()
+        for i, prev in enumerate(seeds):
+            if prev is not None:
+                warm[i, :prev.size] = prev
+        noise = rng.integers(-1, 2, size=(half - 1, n.size, N)) * (rng.random((half - 1, n.size, N)) < 0.3)
+        pop[1:half] = warm[None] + noise
+        pop[1] = warm
+    return _repair(pop, active, w), active, step
+
+def _evolve(weights, n, w, min_headway, seed, generations, time_budget_s, population,
+            seeds=None, tolerance=GA_TOLERANCE, patience=GA_PATIENCE):
+    rng = np.random.default_rng(seed)
+    pop, active, step = _initial_population(n, w, max(4, int(population)), rng, seeds)
+    nf = n.astype(float)
+    fit = _fitness(pop, w, weights, nf, active, min_headway)
+    deadline = time.perf_counter() + float(time_budget_s) if time_budget_s else None
+    best_fit = fit.max(axis=0)
+    stall = 0
+    ran = 0
+    converged = False
+    for _ in range(int(generations)):
+        if deadline and time.perf_counter() > deadline:
+            break
+        pop = _breed(pop, fit, active, w, step, rng)
+        fit = _fitness(pop, w, weights, nf, active, min_headway)
+        ran += 1
+        gen_best = fit.max(axis=0)
+        stall = stall + 1 if np.all(gen_best - best_fit < tolerance) else 0
+        best_fit = np.maximum(best_fit, gen_best)
+        if patience and stall >= patience:
+            converged = True
+            break
+    best = fit.argmax(axis=0)
+    r = np.arange(n.size)
+    return pop[best, r], fit[best, r], ran, converged
+
+def allocate_buses(route_weights, bus_budget, max_per_route):
+    R = len(route_weights)
+    budget = max(0, int(bus_budget))
+    demand = np.sqrt(np.array([float(np.sum(x)) for x in route_weights]))
+    n = np.zeros(R, dtype=int)
+    order = np.argsort(-demand, kind="stable")
+    n[order[:min(R, budget)]] = 1
+    left = budget - int(n.sum())
+    cap = np.full(R, max(1, int(max_per_route)))
+    while left > 0 and (n < cap).any():
+        room = n < cap
+        share = np.where(room, demand, 0.0)
+        if share.sum() <= 0:
+            share = room.astype(float)
+        quota = share / share.sum() * left
+        extra = np.minimum(np.floor(quota).astype(int), cap - n)
+        if extra.sum() == 0:
+            extra[np.argmax(quota - np.floor(quota))] = 1
+        n += extra
+        left -= int(extra.sum())
+    return n
+
+def optimize_fleet(route_delays, window_minutes, bus_budget=None, num_buses=6, min_headway=GA_MIN_HEADWAY,
+                   seed=None, generations=GA_GENERATIONS, time_budget_s=GA_FLEET_TIME_BUDGET_S, population=GA_POPULATION,
+                   previous=None, tolerance=GA_TOLERANCE, patience=GA_PATIENCE, now=None):
+    w = max(1, int(window_minutes))
+    h = max(1, int(min_headway))
+    rids = [str(r) for r in route_delays]
+    if not rids:
+        return {}
+    weights = np.stack([_weights(route_delays[r], w) for r in route_delays])
+    cap = max(1, w // h)
+    if bus_budget is None:
+        n = np.full(len(rids), min(max(1, int(num_buses)), cap))
+    else:
+        n = allocate_buses(weights, bus_budget, cap)
+    out = {r: {"departures_minutes": [], "fitness": 0.0, "generations": 0, "converged": False} for r in rids}
+    live = np.flatnonzero(n > 0)
+    if live.size == 0:
+        return out
+    seeds = None
+    if previous:
+        seeds = [_previous_departures(previous.get(rids[j]), int(n[j]), w, now) for j in live]
+    best, fit, ran, converged = _evolve(weights[live], n[live], w, h, seed, generations, time_budget_s, population,
+                                        seeds, tolerance, patience)
+    for i, j in enumerate(live):
+        out[rids[j]] = {
+            "departures_minutes": best[i, :n[j]].tolist(),
+            "fitness": round(float(fit[i]), 5),
+            "generations": ran,
+            "converged": converged,
+        }
+    return out
+
+def optimize_schedule(num_buses: int, window_minutes: int, predicted_delays, seed=None,
+                      generations=GA_GENERATIONS, time_budget_s=GA_TIME_BUDGET_S, population=GA_POPULATION,
+                      previous=None, tolerance=GA_TOLERANCE, patience=GA_PATIENCE, now=None):
     w = max(1, int(window_minutes))
-    base = np.linspace(0, w - 1, n).astype(int).tolist()
-    pd = np.array(predicted_delays, dtype=float)
-    if pd.size == 0:
-        return {"departures_minutes": base, "fitness": 0.0}
-    risk = pd[:w]
-    spacing = np.diff([0] + base + [w])
-    fit = float(1.0 / (np.var(spacing) + 1e-6) * 0.5 + 1.0 / (np.mean(risk) + 1e-6) * 0.5)
-    return {"departures_minutes": base, "fitness": round(fit, 5)}
+    n = min(max(1, int(num_buses)), w)
+    if np.asarray(predicted_delays, dtype=float).size == 0:
+        return {"departures_minutes": _baseline(n, w).tolist(), "fitness": 0.0, "generations": 0, "converged": False}
+    weights = _weights(predicted_delays, w)[None, :]
+    prev = _previous_departures(previous, n, w, now)
+    seeds = [prev] if prev is not None else None
+    best, fit, ran, converged = _evolve(weights, np.array([n]), w, 1, seed, generations, time_budget_s, population,
+                                        seeds, tolerance, patience)
+    return {
+        "departures_minutes": best[0].tolist(),
+        "fitness": round(float(fit[0]), 5),
+        "generations": ran,
+        "converged": converged,
+    }
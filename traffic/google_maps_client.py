@@ -1,8 +1,36 @@
 import os
 import time
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from .rate_limit import TokenBucket, RateLimited
 
 API_KEY = os.getenv("GOOGLE_MAPS_API_KEY", "")
+GOOGLE_MAPS_CONCURRENCY = int(os.getenv("GOOGLE_MAPS_CONCURRENCY", "8"))
+GOOGLE_MAPS_POOL_SIZE = int(os.getenv("GOOGLE_MAPS_POOL_SIZE", "16"))
+GOOGLE_MAPS_QPS = float(os.getenv("GOOGLE_MAPS_QPS", "10"))
+GOOGLE_MAPS_DAILY_BUDGET = int(os.getenv("GOOGLE_MAPS_DAILY_BUDGET", "0"))
+GOOGLE_MAPS_RATE_FILE = os.getenv("GOOGLE_MAPS_RATE_FILE", "")
+GOOGLE_MAPS_MAX_WAIT_S = float(os.getenv("GOOGLE_MAPS_MAX_WAIT_S", "0.5"))
+GOOGLE_MAPS_BATCH_MAX_WAIT_S = float(os.getenv("GOOGLE_MAPS_BATCH_MAX_WAIT_S", "10"))
+
+limiter = TokenBucket(GOOGLE_MAPS_QPS, daily_budget=GOOGLE_MAPS_DAILY_BUDGET, path=GOOGLE_MAPS_RATE_FILE)
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=GOOGLE_MAPS_POOL_SIZE)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _session = s
+    return _session
 
 class Eta:
     def __init__(self, origin, destination, distance_meters, duration_seconds, duration_in_traffic_seconds):
@@ -12,21 +40,35 @@ class Eta:
         self.duration_seconds = duration_seconds
         self.duration_in_traffic_seconds = duration_in_traffic_seconds
 
+    def snapshot_item(self, route_id, timestamp_iso):
+        return {
+            "route_id": str(route_id),
+            "timestamp_iso": timestamp_iso,
+            "distance_m": self.distance_meters or 0,
+            "duration_s": self.duration_seconds or 0,
+            "duration_in_traffic_s": self.duration_in_traffic_seconds or 0,
+            "source": "google_maps",
+        }
+
 class GoogleMapsClient:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, session=None, rate_limiter=None):
         self.api_key = api_key or API_KEY
         self.url = "https://maps.googleapis.com/maps/api/directions/json"
+        self.session = session or get_session()
+        self.limiter = rate_limiter or limiter
 
-    def get_route_eta(self, origin: str, destination: str):
+    def get_route_eta(self, origin: str, destination: str, max_wait=None):
         params = {
             "origin": origin,
             "destination": destination,
             "departure_time": "now",
             "key": self.api_key,
         }
+        max_wait = GOOGLE_MAPS_MAX_WAIT_S if max_wait is None else max_wait
         backoff = 1.0
         for _ in range(4):
-            r = requests.get(self.url, params=params, timeout=10)
+            self.limiter.acquire(max_wait)
+            r = self.session.get(self.url, params=params, timeout=10)
             if r.status_code == 200:
                 data = r.json()
                 status = data.get("status")
@@ -37,9 +79,27 @@ class GoogleMapsClient:
                     dur_traf = leg.get("duration_in_traffic", {}).get("value", dur)
                     return Eta(origin, destination, dist, dur, dur_traf)
                 if status in ("OVER_QUERY_LIMIT", "RESOURCE_EXHAUSTED"):
-                    time.sleep(backoff)
+                    self.limiter.block(backoff)
                     backoff *= 2
                     continue
+                if status in ("ZERO_RESULTS", "NOT_FOUND", "INVALID_REQUEST", "REQUEST_DENIED"):
+                    return None
+            if backoff > max_wait:
+                return None
             time.sleep(backoff)
             backoff *= 2
         return None
+
+    def _safe_eta(self, pair, max_wait):
+        try:
+            return self.get_route_eta(pair[0], pair[1], max_wait)
+        except (requests.RequestException, RateLimited):
+            return None
+
+    def get_route_etas(self, pairs, concurrency=None, max_wait=GOOGLE_MAPS_BATCH_MAX_WAIT_S):
+        pairs = list(pairs)
+        workers = max(1, min(int(concurrency or GOOGLE_MAPS_CONCURRENCY), len(pairs) or 1))
+        if workers == 1:
+            return [self._safe_eta(p, max_wait) for p in pairs]
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            return list(ex.map(lambda p: self._safe_eta(p, max_wait), pairs))
@@ -1,25 +1,41 @@
 from datetime import datetime, timezone
 from .dynamo_repo import DynamoRepo
 from .google_maps_client import GoogleMapsClient
+from .live_store import append_passengers
 
+def _route_pairs(event):
+    routes = event.get("routes")
+    if routes is None:
+        routes = {event.get("route_id"): (event.get("origin"), event.get("destination"))}
+    elif isinstance(routes, list):
+        routes = {r.get("route_id"): (r.get("origin"), r.get("destination")) for r in routes}
+    return {str(rid): tuple(pair) for rid, pair in routes.items() if rid is not None and pair and all(pair)}
+
+# Passenger counts go to this process's TRAFFIC_LIVE_DIR and only reach the trainer
+# when that is storage shared with the Django process (e.g. EFS).
 def ingestion_handler(event, context):
-    rid = str(event.get("route_id"))
-    origin = event.get("origin")
-    destination = event.get("destination")
-    if not (rid and origin and destination):
+    now = datetime.now(timezone.utc).isoformat()
+    passengers = event.get("passengers") or {}
+    appended = append_passengers(passengers, event.get("timestamp_iso") or now) if passengers else 0
+    stored = appended == len(passengers)
+    pairs = _route_pairs(event)
+    if not pairs:
+        if passengers:
+            return {"ok": stored, "passengers": len(passengers), "passengers_appended": appended}
         return {"ok": False, "error": "missing params"}
     gm = GoogleMapsClient()
-    eta = gm.get_route_eta(origin, destination)
-    if not eta:
-        return {"ok": False, "error": "no eta"}
+    etas = gm.get_route_etas(pairs.values())
+    items = [eta.snapshot_item(rid, now) for rid, eta in zip(pairs, etas) if eta]
+    if not items:
+        return {"ok": False, "error": "no eta", "passengers_appended": appended}
     repo = DynamoRepo()
-    now = datetime.now(timezone.utc).isoformat()
-    repo.put_snapshot({
-        "route_id": rid,
-        "timestamp_iso": now,
-        "distance_m": eta.distance_meters or 0,
-        "duration_s": eta.duration_seconds or 0,
-        "duration_in_traffic_s": eta.duration_in_traffic_seconds or 0,
-        "source": "google_maps",
-    })
-    return {"ok": True}
+    res = repo.put_snapshots_bulk(items)
+    missing = [rid for rid, eta in zip(pairs, etas) if not eta]
+    return {
+        "ok": res["failed"] == 0 and not missing and stored,
+        "count": len(pairs),
+        "written": res["written"],
+        "failed": res["failed"],
+        "missing": missing,
+        "passengers_appended": appended,
+    }
@@ -0,0 +1,183 @@
+import os
+import time
+import glob
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+LIVE_STORE_DIR = os.getenv("TRAFFIC_LIVE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "live")
+LIVE_RETENTION_DAYS = int(os.getenv("TRAFFIC_LIVE_RETENTION_DAYS", "0"))
+DAY_NS = 86400 * 10**9
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = {
+    "passengers": ("boarding", "landing", "loader"),
+}
+
+def _ns(ts):
+    t = pd.Timestamp(ts)
+    if t.tzinfo is not None:
+        t = t.tz_convert(None)
+    return t.value
+
+class _Route:
+    def __init__(self, width):
+        self.ts = np.zeros(0, dtype=np.int64)
+        self.values = np.zeros((0, width), dtype=np.float64)
+        self.size = 0
+        self.sorted = True
+
+    def add(self, ts, values):
+        n = self.size
+        if n == len(self.ts):
+            extra = max(64, n)
+            self.ts = np.concatenate([self.ts, np.zeros(extra, dtype=np.int64)])
+            self.values = np.concatenate([self.values, np.zeros((extra, self.values.shape[1]))])
+        if n and ts < self.ts[n - 1]:
+            self.sorted = False
+        self.ts[n] = ts
+        self.values[n] = values
+        self.size = n + 1
+
+    def arrays(self):
+        n = self.size
+        if not self.sorted:
+            order = np.argsort(self.ts[:n], kind="stable")
+            self.ts, self.values = self.ts[:n][order], self.values[:n][order]
+            self.sorted = True
+        return self.ts[:n], self.values[:n]
+
+    def trim(self, cutoff_ns):
+        ts, vals = self.arrays()
+        k = int(np.searchsorted(ts, cutoff_ns, side="left"))
+        if k:
+            self.ts, self.values = ts[k:].copy(), vals[k:].copy()
+            self.size -= k
+
+class LiveStore:
+    def __init__(self, root=LIVE_STORE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._offsets = {}
+        self._routes = {kind: {} for kind in COLUMNS}
+        self._pruned = {}
+
+    def _partition(self, kind, ts_ns):
+        day = pd.Timestamp(ts_ns).strftime("%Y-%m-%d")
+        return os.path.join(self.root, kind, f"{day}.csv")
+
+    def append(self, kind, rows):
+        width = len(COLUMNS[kind])
+        parts = {}
+        for route_id, ts, values in rows:
+            values = [float(v or 0) for v in values][:width]
+            if len(values) < width:
+                values += [0.0] * (width - len(values))
+            t = _ns(ts)
+            line = ",".join([str(t), str(route_id)] + [repr(v) for v in values]) + "\n"
+            parts.setdefault(self._partition(kind, t), []).append(line)
+        if not parts:
+            return 0
+        os.makedirs(os.path.join(self.root, kind), exist_ok=True)
+        for path, lines in parts.items():
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+        return sum(len(lines) for lines in parts.values())
+
+    def _prune(self, kind, now_ns=None):
+        if LIVE_RETENTION_DAYS <= 0:
+            return
+        cutoff = (now_ns or time.time_ns()) - LIVE_RETENTION_DAYS * DAY_NS
+        keep = self._partition(kind, cutoff)
+        if self._pruned.get(kind) == keep:
+            return
+        for path in glob.glob(os.path.join(self.root, kind, "*.csv")):
+            if path < keep:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning("live store prune of %s failed: %r", path, e)
+        for route in self._routes[kind].values():
+            route.trim(cutoff)
+        self._pruned[kind] = keep
+
+    def _refresh(self, kind):
+        self._prune(kind)
+        routes = self._routes[kind]
+        width = len(COLUMNS[kind])
+        paths = sorted(glob.glob(os.path.join(self.root, kind, "*.csv")))
+        for path in set(self._offsets) - set(paths):
+            if os.path.dirname(path) == os.path.join(self.root, kind):
+                del self._offsets[path]
+        for path in paths:
+            offset = self._offsets.get(path, 0)
+            try:
+                if os.path.getsize(path) <= offset:
+                    continue
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    chunk = f.read()
+            except OSError:
+                continue
+            end = chunk.rfind(b"\n") + 1
+            for line in chunk[:end].decode("utf-8").splitlines():
+                parts = line.split(",")
+                if len(parts) != width + 2:
+                    continue
+                route = routes.get(parts[1])
+                if route is None:
+                    route = routes[parts[1]] = _Route(width)
+                route.add(int(parts[0]), [float(v) for v in parts[2:]])
+            self._offsets[path] = offset + end
+
+    def route_rows(self, kind, route_id, since=None):
+        with self._lock:
+            self._refresh(kind)
+            route = self._routes[kind].get(str(route_id))
+            if route is None:
+                return np.zeros(0, dtype=np.int64), np.zeros((0, len(COLUMNS[kind])))
+            ts, vals = route.arrays()
+        if since is not None:
+            lo = int(np.searchsorted(ts, since, side="right"))
+            ts, vals = ts[lo:], vals[lo:]
+        return ts, vals
+
+    def rows_since(self, kind, since):
+        out = {}
+        with self._lock:
+            self._refresh(kind)
+            routes = self._routes[kind]
+            for route_id, t in since.items():
+                route = routes.get(str(route_id))
+                if route is None:
+                    continue
+                ts, vals = route.arrays()
+                lo = int(np.searchsorted(ts, t, side="right")) if t is not None else 0
+                if lo < ts.size:
+                    out[route_id] = ts[lo:], vals[lo:]
+        return out
+
+    def route_frame(self, kind, route_id, since=None):
+        ts, vals = self.route_rows(kind, route_id, since)
+        df = pd.DataFrame(vals, columns=list(COLUMNS[kind]))
+        df.insert(0, "timestamp", pd.to_datetime(ts))
+        return df
+
+    def stats(self):
+        with self._lock:
+            return {kind: {"routes": len(r), "rows": sum(x.size for x in r.values())} for kind, r in self._routes.items()}
+
+live_store = LiveStore()
+
+def _safe_append(kind, rows):
+    try:
+        return live_store.append(kind, rows)
+    except OSError as e:
+        logger.warning("live store append (%s) failed: %r", kind, e)
+        return 0
+
+def append_passengers(route_counts, timestamp_iso):
+    cols = COLUMNS["passengers"]
+    return _safe_append("passengers", ((rid, timestamp_iso, [c.get(k, 0) for k in cols]) for rid, c in route_counts.items()))
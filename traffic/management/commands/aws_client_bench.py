@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from traffic.aws_pool import measure
+
+class Command(BaseCommand):
+    help = "Compare boto3 client construction time with pooled client reuse"
+
+    def add_arguments(self, parser):
+        parser.add_argument("services", nargs="*", default=["dynamodb", "s3", "sqs", "secretsmanager"])
+        parser.add_argument("-n", type=int, default=5)
+
+    def handle(self, *args, **options):
+        for service in options["services"]:
+            r = measure(service, n=options["n"])
+            self.stdout.write(f"{service}: construct={r['construct_ms']}ms pooled={r['pooled_ms']}ms")
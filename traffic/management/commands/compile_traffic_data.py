@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from traffic.columnar import compile_snapshot
+from traffic.prediction import SNAPSHOT_DIR, _paths, _parse_csvs
+from traffic.profiles import PROFILE_INDEX_PATH, build_profile_index
+
+class Command(BaseCommand):
+    help = "Compile traffic/data CSVs into a memory-mappable columnar snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--out", default=SNAPSHOT_DIR)
+        parser.add_argument("--profiles", default=PROFILE_INDEX_PATH)
+
+    def handle(self, *args, **options):
+        paths = _paths()
+        manifest = compile_snapshot(paths, _parse_csvs(paths), options["out"])
+        routes = len(manifest["columns"]["boarding"])
+        self.stdout.write(f"wrote {manifest['rows']} rows x {routes} routes to {options['out']}")
+        index = build_profile_index(paths)
+        index.save(options["profiles"])
+        self.stdout.write(f"wrote hour-of-week profiles for {len(index.routes)} routes to {options['profiles']}")
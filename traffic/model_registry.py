@@ -0,0 +1,120 @@
+import os
+import json
+import glob
+import hashlib
+import threading
+from collections import OrderedDict
+import joblib
+import numpy as np
+import sklearn
+
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "64"))
+MODEL_STORE_DIR = os.getenv("MODEL_STORE_DIR", "")
+
+def fingerprint(*arrays, **meta):
+    h = hashlib.sha1()
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        h.update(f"{a.dtype}{a.shape}".encode("utf-8"))
+        h.update(a.tobytes())
+    meta["sklearn"] = sklearn.__version__
+    h.update(json.dumps(meta, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+class ModelRegistry:
+    def __init__(self, max_size=MODEL_CACHE_SIZE, store_dir=MODEL_STORE_DIR):
+        self.max_size = max(1, int(max_size))
+        self.store_dir = store_dir
+        self._lock = threading.Lock()
+        self._models = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.fits = 0
+        self.evictions = 0
+
+    def _path(self, route_id, fp):
+        return os.path.join(self.store_dir, str(route_id), fp + ".joblib")
+
+    def _load(self, route_id, fp):
+        if not self.store_dir:
+            return None
+        p = self._path(route_id, fp)
+        if not os.path.exists(p):
+            return None
+        try:
+            return joblib.load(p)
+        except Exception:
+            return None
+
+    def _save(self, route_id, fp, model):
+        if not self.store_dir:
+            return
+        p = self._path(route_id, fp)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        tmp = p + ".tmp"
+        joblib.dump(model, tmp)
+        os.replace(tmp, p)
+        for old in glob.glob(os.path.join(os.path.dirname(p), "*.joblib")):
+            if old != p:
+                os.remove(old)
+
+    def _insert(self, key, model):
+        with self._lock:
+            self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_size:
+                self._models.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, route_id, fp):
+        key = (str(route_id), fp)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return model
+        model = self._load(route_id, fp)
+        if model is not None:
+            self.disk_hits += 1
+            self._insert(key, model)
+        return model
+
+    def latest(self, route_id):
+        rid = str(route_id)
+        with self._lock:
+            for (r, fp), model in reversed(self._models.items()):
+                if r == rid:
+                    return fp, model
+        if not self.store_dir:
+            return None
+        paths = glob.glob(os.path.join(self.store_dir, rid, "*.joblib"))
+        if not paths:
+            return None
+        fp = os.path.splitext(os.path.basename(paths[0]))[0]
+        model = self.get(rid, fp)
+        return (fp, model) if model is not None else None
+
+    def put(self, route_id, fp, model):
+        self.fits += 1
+        self._insert((str(route_id), fp), model)
+        self._save(route_id, fp, model)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._models),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "fits": self.fits,
+            "evictions": self.evictions,
+        }
+
+def model_version(family, fp):
+    return f"{family}-{fp[:12]}"
+
+registry = ModelRegistry()
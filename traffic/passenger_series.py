@@ -0,0 +1,95 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from .dataset import dataset_cache
+from .prediction import load_historical_for_route, get_route_ids, _paths
+from .live_store import live_store
+
+PASSENGER_SERIES_ROWS = int(os.getenv("PASSENGER_SERIES_ROWS", "1440"))
+FIELDS = ("boarding", "landing", "loader")
+
+class RouteSeries:
+    def __init__(self, capacity=PASSENGER_SERIES_ROWS):
+        self.capacity = max(1, int(capacity))
+        self.ts = np.zeros(self.capacity, dtype=np.int64)
+        self.values = np.zeros((len(FIELDS), self.capacity), dtype=np.int32)
+        self.start = 0
+        self.size = 0
+        self._lock = threading.Lock()
+
+    def extend(self, ts, boarding, landing, loader):
+        ts = np.asarray(ts, dtype=np.int64)[-self.capacity:]
+        n = ts.size
+        if n == 0:
+            return
+        vals = np.stack([np.asarray(v)[-n:] for v in (boarding, landing, loader)]).astype(np.int32)
+        with self._lock:
+            end = (self.start + self.size) % self.capacity
+            idx = (end + np.arange(n)) % self.capacity
+            self.ts[idx] = ts
+            self.values[:, idx] = vals
+            overflow = max(0, self.size + n - self.capacity)
+            self.start = (self.start + overflow) % self.capacity
+            self.size = min(self.capacity, self.size + n)
+
+    def last(self):
+        with self._lock:
+            return int(self.ts[(self.start + self.size - 1) % self.capacity]) if self.size else None
+
+    def window(self, since=None, limit=60):
+        with self._lock:
+            idx = (self.start + np.arange(self.size)) % self.capacity
+            ts = self.ts[idx]
+            lo, hi = 0, ts.size
+            if since is not None:
+                lo = int(np.searchsorted(ts, since, side="right"))
+                if limit:
+                    hi = min(hi, lo + int(limit))
+            elif limit:
+                lo = max(0, hi - int(limit))
+            ts, vals = ts[lo:hi], self.values[:, idx[lo:hi]]
+        out = {"timestamp": np.datetime_as_string(ts.astype("datetime64[ns]"), unit="s").tolist()}
+        for name, v in zip(FIELDS, vals):
+            out[name] = v.tolist()
+        return out
+
+def _build(route_id):
+    df = load_historical_for_route(route_id).tail(PASSENGER_SERIES_ROWS)
+    s = RouteSeries()
+    ts = pd.to_datetime(df["timestamp"])
+    if ts.dt.tz is not None:
+        ts = ts.dt.tz_convert(None)
+    s.extend(ts.to_numpy(dtype="datetime64[ns]").view(np.int64), df["signal"].to_numpy(), df["landing"].to_numpy(), df["loader"].to_numpy())
+    return s
+
+class PassengerSeries:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def route(self, route_id):
+        rid = str(route_id)
+        s = self._routes.get(rid)
+        if s is None:
+            if rid not in get_route_ids():
+                return None
+            built = _build(rid)
+            with self._lock:
+                s = self._routes.setdefault(rid, built)
+        with self._lock:
+            ts, vals = live_store.route_rows("passengers", rid, s.last())
+            if ts.size:
+                s.extend(ts, vals[:, 0], vals[:, 1], vals[:, 2])
+        return s
+
+def passenger_series():
+    return dataset_cache.get("passenger_series", _paths(), lambda _: PassengerSeries())
+
+def parse_since(value):
+    if not value:
+        return None
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(None)
+    return ts.value
@@ -1,11 +1,47 @@
 import os
+import abc
+import csv
+import copy
 import glob
+import json
+import hashlib
+import logging
+import threading
+import time
+import zlib
+from collections import namedtuple
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+from .dataset import dataset_cache
+from .columnar import MANIFEST, open_snapshot, export_shared, attach_shared
+from .features import FEATURES, FleetFeatures
+from .forecast import forecast_batch
+from .model_registry import registry, fingerprint, model_version
+from .live_store import live_store
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data")
+SNAPSHOT_DIR = os.getenv("TRAFFIC_SNAPSHOT_DIR") or os.path.join(DATA_DIR, "columnar")
+
+MODEL_FAMILY = "rf_v1"
+MODEL_PARAMS = {"n_estimators": 140, "random_state": 42}
+MODEL_UPDATE_MODE = os.getenv("MODEL_UPDATE_MODE", "incremental")
+MODEL_UPDATE_TREES = int(os.getenv("MODEL_UPDATE_TREES", "20"))
+MODEL_UPDATE_WINDOW = int(os.getenv("MODEL_UPDATE_WINDOW", "288"))
+MODEL_HOLDOUT_ROWS = int(os.getenv("MODEL_HOLDOUT_ROWS", "48"))
+MODEL_EVAL_EVERY = int(os.getenv("MODEL_EVAL_EVERY", "24"))
+MODEL_REFIT_TOLERANCE = float(os.getenv("MODEL_REFIT_TOLERANCE", "0.1"))
+FORECASTER = os.getenv("FORECASTER", "rf")
+FORECAST_LATENCY_BUDGET_S = float(os.getenv("FORECAST_LATENCY_BUDGET_S", "0.1"))
+FORECASTER_RESELECT_EVERY = int(os.getenv("FORECASTER_RESELECT_EVERY", "24"))
+
+FittedModel = namedtuple("FittedModel", ["model", "version", "last", "update"], defaults=(None,))
+
+logger = logging.getLogger(__name__)
+_updates = {}
+_updates_lock = threading.Lock()
 
 def _csv_by_prefix(prefix):
     files = sorted(glob.glob(os.path.join(DATA_DIR, "*.csv")))
@@ -23,11 +59,8 @@ def _paths():
         raise FileNotFoundError("boarding/landing/loader CSVs not found in traffic/data/")
     return b, l, d
 
-def _read_csvs():
-    b, l, d = _paths()
-    b = pd.read_csv(b)
-    l = pd.read_csv(l)
-    d = pd.read_csv(d)
+def _parse_csvs(paths):
+    b, l, d = (pd.read_csv(p) for p in paths)
     for df in (b, l, d):
         first = df.columns[0]
         if first != "timestamp":
@@ -35,15 +68,83 @@ def _read_csvs():
         df["timestamp"] = pd.to_datetime(df["timestamp"])
     return b, l, d
 
+def _snapshot():
+    paths = _paths()
+    manifest = os.path.join(SNAPSHOT_DIR, MANIFEST)
+    if not os.path.exists(manifest):
+        return None
+    return dataset_cache.get("snapshot", paths + (manifest,), lambda _: open_snapshot(SNAPSHOT_DIR, paths))
+
+def _read_csvs():
+    snap = _snapshot()
+    if snap is not None:
+        return snap.frames()
+    return dataset_cache.get("csv", _paths(), _parse_csvs)
+
+def export_dataset():
+    if _snapshot() is not None:
+        return None, None
+    return export_shared(_read_csvs())
+
+def attach_dataset(meta):
+    shm, frames = attach_shared(meta)
+    dataset_cache.prime("csv", _paths(), frames)
+    return shm
+
+def dataset_stats():
+    return dataset_cache.stats()
+
+def _route_ids(columns):
+    cols = [str(c) for c in columns if str(c) != "timestamp"]
+    ids = [c for c in cols if c.isdigit() and 5 <= len(c) <= 6]
+    return ids or cols
+
+def _load_catalog(paths):
+    with open(paths[0], newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), [])
+    ids = _route_ids(dict.fromkeys(header[1:]))
+    routes = sorted(ids)
+    etag = hashlib.sha1(json.dumps(routes).encode("utf-8")).hexdigest()[:16]
+    return {"ids": ids, "routes": routes, "etag": etag}
+
+def route_catalog():
+    return dataset_cache.get("route_catalog", _paths(), _load_catalog)
+
 def get_route_ids():
-    b, _, _ = _read_csvs()
-    cols = [c for c in b.columns if c != "timestamp"]
-    ids = [c for c in cols if str(c).isdigit() and 5 <= len(str(c)) <= 6]
-    if not ids:
-        ids = cols
-    return [str(x) for x in ids]
+    return list(route_catalog()["ids"])
+
+def _historical_from_snapshot(snap, route_id):
+    r = str(route_id)
+    if not snap.has("boarding", r):
+        ids = get_route_ids()
+        if not ids:
+            raise ValueError("no route ids detected")
+        r = ids[0]
+    cols = {"signal": snap.column("boarding", r)}
+    for kind in ("landing", "loader"):
+        cols[kind] = snap.column(kind, r) if snap.has(kind, r) else snap.column(kind, snap.columns[kind][0])
+    df = pd.DataFrame({"timestamp": snap.timestamps})
+    for name, col in cols.items():
+        df[name] = col.astype(np.float64)
+    return df.fillna(0)
+
+def _live_rows(route_id, last_ts):
+    since = pd.Timestamp(last_ts).value if last_ts is not None else None
+    return live_store.route_frame("passengers", route_id, since).rename(columns={"boarding": "signal"})
+
+def _with_live(df, route_id):
+    live = _live_rows(route_id, df["timestamp"].iloc[-1] if len(df) else None)
+    if live.empty:
+        return df
+    return pd.concat([df, live[df.columns]], ignore_index=True)
 
 def load_historical_for_route(route_id):
+    return _with_live(_load_baseline(route_id), route_id)
+
+def _load_baseline(route_id):
+    snap = _snapshot()
+    if snap is not None:
+        return _historical_from_snapshot(snap, route_id)
     b, l, d = _read_csvs()
     r = str(route_id)
     if r not in b.columns:
@@ -71,30 +172,220 @@ def _features(df):
     X = X.fillna(0)
     return X
 
+def fleet_features():
+    return dataset_cache.get("features", _paths(), lambda _: FleetFeatures(_read_csvs()))
+
+def _route_training_data(route_id):
+    try:
+        fleet = fleet_features()
+    except ValueError:
+        fleet = None
+    if fleet is None:
+        X = _features(load_historical_for_route(route_id))
+        return X[FEATURES].values, (X["mix"] * 10.0).values
+    r = str(route_id)
+    if not fleet.has(r):
+        ids = get_route_ids()
+        if not ids:
+            raise ValueError("no route ids detected")
+        r = ids[0]
+    live = _live_rows(route_id, fleet.timestamps.iloc[-1])
+    if live.empty:
+        return fleet.matrix(r), fleet.target(r)
+    return fleet.with_tail(r, live["timestamp"], live["signal"], live["landing"], live["loader"])
+
+def _full_fit(Xf, y):
+    return RandomForestRegressor(**MODEL_PARAMS).fit(Xf, y)
+
+def _grow(model, X, y, trees):
+    m = copy.copy(model)
+    m.estimators_ = list(model.estimators_)
+    m.set_params(warm_start=True, n_estimators=len(m.estimators_) + trees)
+    m.fit(X, y)
+    m.estimators_ = m.estimators_[trees:]
+    m.set_params(warm_start=False, n_estimators=len(m.estimators_))
+    return m
+
+def _tag(model, Xf, y):
+    model.traffic_rows_ = len(y)
+    model.traffic_data_fp_ = fingerprint(Xf, y)
+    return model
+
+def _incremental_base(route_id, Xf, y):
+    if MODEL_UPDATE_MODE != "incremental":
+        return None
+    with _updates_lock:
+        if _updates.get(str(route_id), {}).get("refit_due"):
+            return None
+    prev = registry.latest(route_id)
+    if prev is None:
+        return None
+    model = prev[1]
+    n0 = getattr(model, "traffic_rows_", 0)
+    if not 0 < n0 < len(y) or len(y) - n0 > MODEL_UPDATE_WINDOW:
+        return None
+    if fingerprint(Xf[:n0], y[:n0]) != getattr(model, "traffic_data_fp_", None):
+        return None
+    return model, n0
+
+def _mae(model, X, y):
+    return float(np.mean(np.abs(model.predict(X) - y)))
+
+def evaluate_update(Xf, y, step=1, holdout=MODEL_HOLDOUT_ROWS):
+    h = max(1, min(int(holdout), len(y) // 4))
+    tx, ty, hx, hy = Xf[:-h], y[:-h], Xf[-h:], y[-h:]
+    step = max(1, min(int(step), len(ty) // 2))
+    w = MODEL_UPDATE_WINDOW
+    full = _full_fit(tx, ty)
+    inc = _grow(_full_fit(tx[:-step], ty[:-step]), tx[-w:], ty[-w:], MODEL_UPDATE_TREES)
+    full_mae, inc_mae = _mae(full, hx, hy), _mae(inc, hx, hy)
+    gap = (inc_mae - full_mae) / full_mae if full_mae > 0 else 0.0
+    return {
+        "holdout_rows": h,
+        "full_mae": round(full_mae, 4),
+        "incremental_mae": round(inc_mae, 4),
+        "gap": round(gap, 4),
+        "refit_due": gap > MODEL_REFIT_TOLERANCE,
+    }
+
+def _eval_offset(route_id):
+    return zlib.crc32(str(route_id).encode("utf-8")) % MODEL_EVAL_EVERY if MODEL_EVAL_EVERY else 0
+
+def _record_update(route_id, kind, Xf, y, step):
+    rid = str(route_id)
+    with _updates_lock:
+        st = _updates.setdefault(rid, {"full": 0, "incremental": 0, "since_eval": _eval_offset(rid), "refit_due": False, "last_eval": None})
+        st[kind] += 1
+        if kind == "full":
+            st.update(since_eval=_eval_offset(rid), refit_due=False)
+            return
+        st["since_eval"] += 1
+        if not MODEL_EVAL_EVERY or st["since_eval"] < MODEL_EVAL_EVERY:
+            return
+        st["since_eval"] = 0
+    report = evaluate_update(Xf, y, step)
+    logger.info("route %s incremental vs full refit on holdout: %s", rid, report)
+    with _updates_lock:
+        st.update(last_eval=report, refit_due=report["refit_due"])
+
+def model_update_report(route_id=None):
+    with _updates_lock:
+        if route_id is not None:
+            return copy.deepcopy(_updates.get(str(route_id)))
+        return copy.deepcopy(_updates)
+
+class Forecaster(abc.ABC):
+    family = None
+    params = {}
+
+    def key(self, route_id):
+        return str(route_id) if self.family == MODEL_FAMILY else f"{route_id}.{self.family}"
+
+    @abc.abstractmethod
+    def estimator(self):
+        pass
+
+    def fit_arrays(self, Xf, y):
+        return self.estimator().fit(Xf, y)
+
+    def update(self, route_id, Xf, y):
+        return self.fit_arrays(Xf, y), "full"
+
+    def fit(self, route_id, Xf=None, y=None):
+        if Xf is None:
+            Xf, y = _route_training_data(route_id)
+        fp = fingerprint(Xf, y, family=self.family, features=FEATURES, params=self.params)
+        version = model_version(self.family, fp)
+        model = registry.get(self.key(route_id), fp)
+        if model is not None:
+            return FittedModel(model, version, Xf[-1], "cached")
+        model, kind = self.update(route_id, Xf, y)
+        registry.put(self.key(route_id), fp, model)
+        return FittedModel(model, version, Xf[-1], kind)
+
+class ForestForecaster(Forecaster):
+    family = MODEL_FAMILY
+    params = MODEL_PARAMS
+
+    def estimator(self):
+        return RandomForestRegressor(**self.params)
+
+    def update(self, route_id, Xf, y):
+        base = _incremental_base(route_id, Xf, y)
+        if base is None:
+            model, kind, step = self.fit_arrays(Xf, y), "full", 0
+        else:
+            prev, n0 = base
+            w = MODEL_UPDATE_WINDOW
+            model, kind, step = _grow(prev, Xf[-w:], y[-w:], MODEL_UPDATE_TREES), "incremental", len(y) - n0
+        _record_update(route_id, kind, Xf, y, step)
+        return _tag(model, Xf, y), kind
+
+class RidgeForecaster(Forecaster):
+    family = "ridge_v1"
+    params = {"alpha": 1.0}
+
+    def estimator(self):
+        return Ridge(**self.params)
+
+FORECASTERS = {"rf": ForestForecaster(), "ridge": RidgeForecaster()}
+_selection = {}
+_selection_lock = threading.Lock()
+
+def register_forecaster(name, forecaster):
+    FORECASTERS[name] = forecaster
+
+def evaluate_forecasters(route_id, window_minutes=60, holdout=MODEL_HOLDOUT_ROWS, names=None):
+    Xf, y = _route_training_data(route_id)
+    h = max(1, min(int(holdout), len(y) // 4))
+    report = {}
+    for name in names or FORECASTERS:
+        f = FORECASTERS[name]
+        t0 = time.perf_counter()
+        model = f.fit_arrays(Xf[:-h], y[:-h])
+        fit_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        forecast_batch([FittedModel(model, None, Xf[-h - 1])], window_minutes)
+        forecast_s = time.perf_counter() - t0
+        report[name] = {
+            "holdout_mae": round(_mae(model, Xf[-h:], y[-h:]), 4),
+            "fit_s": round(fit_s, 5),
+            "forecast_s": round(forecast_s, 6),
+        }
+    return report
+
+def select_forecaster(route_id, latency_budget_s=FORECAST_LATENCY_BUDGET_S, window_minutes=60):
+    rid = str(route_id)
+    with _selection_lock:
+        sel = _selection.get(rid)
+        if sel and sel["uses"] < FORECASTER_RESELECT_EVERY:
+            sel["uses"] += 1
+            return sel["name"]
+    report = evaluate_forecasters(rid, window_minutes)
+    fits = [n for n, r in report.items() if r["fit_s"] + r["forecast_s"] <= latency_budget_s]
+    if fits:
+        name = min(fits, key=lambda n: report[n]["holdout_mae"])
+    else:
+        name = min(report, key=lambda n: report[n]["fit_s"] + report[n]["forecast_s"])
+    logger.info("route %s forecaster %s (budget %.3fs): %s", rid, name, latency_budget_s, report)
+    with _selection_lock:
+        _selection[rid] = {"name": name, "uses": 1, "report": report}
+    return name
+
+def forecaster_report(route_id=None):
+    with _selection_lock:
+        if route_id is not None:
+            return copy.deepcopy(_selection.get(str(route_id)))
+        return copy.deepcopy(_selection)
+
+def fit_route_model(route_id, forecaster=None):
+    name = forecaster or FORECASTER
+    if name == "auto":
+        name = select_forecaster(route_id)
+    return FORECASTERS[name].fit(route_id)
+
+def forecast_window(fitted, window_minutes):
+    return forecast_batch([fitted], window_minutes)[0]
+
 def train_and_predict_for_window(route_id, start_ts, window_minutes):
-    df = load_historical_for_route(route_id)
-    X = _features(df)
-    y = (X["mix"] * 10.0).values
-    feats = ["hour", "weekday", "month", "signal_lag1", "signal_lag2", "signal_roll3", "landing", "loader"]
-    model = RandomForestRegressor(n_estimators=140, random_state=42)
-    model.fit(X[feats].values, y)
-    last = X.iloc[-1]
-    preds = []
-    hour = float(last["hour"])
-    weekday = float(last["weekday"])
-    month = float(last["month"])
-    lag1 = float(last["signal_lag1"])
-    lag2 = float(last["signal_lag2"])
-    roll = float(last["signal_roll3"])
-    landing = float(last["landing"])
-    loader = float(last["loader"])
-    for _ in range(int(window_minutes)):
-        f = np.array([[hour, weekday, month, lag1, lag2, roll, landing, loader]])
-        yhat = float(model.predict(f)[0])
-        preds.append(max(0.0, yhat))
-        lag2, lag1 = lag1, roll
-        roll = (roll * 2 + yhat / 10.0) / 3.0
-        hour = (hour + 1 / 60.0) % 24
-        landing = max(0.0, landing * 0.95)
-        loader = max(0.0, loader * 0.95)
-    return np.array(preds)
+    return forecast_window(fit_route_model(route_id), window_minutes)
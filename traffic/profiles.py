@@ -0,0 +1,174 @@
+import os
+import json
+import tempfile
+import threading
+import numpy as np
+from .columnar import KINDS, _source_info
+from .dataset import dataset_cache
+from .live_store import live_store
+from .prediction import DATA_DIR, _paths, _load_baseline, get_route_ids
+
+PROFILE_INDEX_PATH = os.getenv("PROFILE_INDEX_PATH") or os.path.join(DATA_DIR, "profiles", "hour_of_week.npz")
+PROFILE_INDEX_SAVE_MINUTES = int(os.getenv("PROFILE_INDEX_SAVE_MINUTES", "10"))
+FORMAT_VERSION = 2
+HOURS = 168
+BINS_PER_DOUBLING = 8
+BINS = 128
+HOUR_NS = 3600 * 10**9
+
+def hour_of_week(ts_ns):
+    h = np.asarray(ts_ns, dtype=np.int64) // HOUR_NS
+    return ((h // 24 + 3) % 7) * 24 + h % 24
+
+def _bin(values):
+    v = np.maximum(np.asarray(values, dtype=np.float64), 0.0)
+    return np.minimum((np.log2(v + 1.0) * BINS_PER_DOUBLING).astype(np.int64), BINS - 1)
+
+def _bin_edges():
+    return 2.0 ** (np.arange(BINS + 1) / BINS_PER_DOUBLING) - 1.0
+
+class ProfileIndex:
+    def __init__(self, routes, sources=None):
+        self.routes = [str(r) for r in routes]
+        self._pos = {r: i for i, r in enumerate(self.routes)}
+        self.sources = sources or {}
+        shape = (len(self.routes), len(KINDS), HOURS)
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.total = np.zeros(shape, dtype=np.float64)
+        self.sq = np.zeros(shape, dtype=np.float64)
+        self.hist = np.zeros(shape + (BINS,), dtype=np.uint32)
+        self.lo = np.full(shape, np.inf)
+        self.hi = np.full(shape, -np.inf)
+        self.last_ts = np.full(len(self.routes), np.iinfo(np.int64).min, dtype=np.int64)
+        self._edges = _bin_edges()
+        self.dirty = False
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def has(self, route_id):
+        return str(route_id) in self._pos
+
+    def add(self, route_id, ts_ns, values):
+        i = self._pos[str(route_id)]
+        ts_ns = np.asarray(ts_ns, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64).reshape(len(ts_ns), len(KINDS))
+        if ts_ns.size == 0:
+            return 0
+        how = hour_of_week(ts_ns)
+        with self._lock:
+            for k in range(len(KINDS)):
+                v = values[:, k]
+                np.add.at(self.count[i, k], how, 1)
+                np.add.at(self.total[i, k], how, v)
+                np.add.at(self.sq[i, k], how, v * v)
+                np.add.at(self.hist[i, k], (how, _bin(v)), 1)
+                np.minimum.at(self.lo[i, k], how, v)
+                np.maximum.at(self.hi[i, k], how, v)
+            self.last_ts[i] = max(int(self.last_ts[i]), int(ts_ns.max()))
+            self.dirty = True
+        return int(ts_ns.size)
+
+    def _quantile(self, hist, n, q, vmin, vmax):
+        target = q * n
+        cum = np.cumsum(hist)
+        b = int(np.searchsorted(cum, target, side="left"))
+        if b == 0:
+            return float(vmin)
+        prev = cum[b - 1] if b else 0
+        frac = (target - prev) / hist[b] if hist[b] else 0.0
+        lo, hi = max(self._edges[b], vmin), min(self._edges[b + 1], vmax)
+        return float(min(max(lo + (hi - lo) * frac, vmin), vmax))
+
+    def expected(self, route_id, ts_ns, kind="boarding", quantiles=(0.1, 0.5, 0.9)):
+        i, k = self._pos[str(route_id)], KINDS.index(kind)
+        h = int(hour_of_week(ts_ns))
+        n = int(self.count[i, k, h])
+        out = {"hour_of_week": h, "count": n, "mean": None, "std": None}
+        out.update({f"p{int(q * 100)}": None for q in quantiles})
+        if not n:
+            return out
+        mean = self.total[i, k, h] / n
+        out["mean"] = round(float(mean), 3)
+        out["std"] = round(float(np.sqrt(max(self.sq[i, k, h] / n - mean * mean, 0.0))), 3)
+        for q in quantiles:
+            out[f"p{int(q * 100)}"] = round(self._quantile(self.hist[i, k, h], n, q, self.lo[i, k, h], self.hi[i, k, h]), 3)
+        return out
+
+    def zscore(self, route_id, ts_ns, value, kind="boarding"):
+        e = self.expected(route_id, ts_ns, kind, quantiles=())
+        if not e["count"] or not e["std"]:
+            return 0.0
+        return (float(value) - e["mean"]) / e["std"]
+
+    def profile(self, route_id, kind="boarding"):
+        i, k = self._pos[str(route_id)], KINDS.index(kind)
+        n = self.count[i, k]
+        mean = np.divide(self.total[i, k], n, out=np.zeros(HOURS), where=n > 0)
+        return {"count": n.tolist(), "mean": np.round(mean, 3).tolist()}
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        meta = {"version": FORMAT_VERSION, "routes": self.routes, "sources": self.sources, "bins": BINS, "bins_per_doubling": BINS_PER_DOUBLING}
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with self._lock:
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, meta=np.array(json.dumps(meta)), count=self.count, total=self.total, sq=self.sq, hist=self.hist, lo=self.lo, hi=self.hi, last_ts=self.last_ts)
+                os.replace(tmp, path)
+                self.dirty = False
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            meta = json.loads(str(z["meta"]))
+            if meta.get("version") != FORMAT_VERSION or meta.get("bins") != BINS or meta.get("bins_per_doubling") != BINS_PER_DOUBLING:
+                return None
+            idx = cls(meta["routes"], meta["sources"])
+            for name in ("count", "total", "sq", "hist", "lo", "hi", "last_ts"):
+                setattr(idx, name, z[name].copy())
+        return idx
+
+    def refresh_live(self):
+        added = 0
+        with self._refresh_lock:
+            since = {r: int(self.last_ts[i]) for i, r in enumerate(self.routes)}
+            for r, (ts, vals) in live_store.rows_since("passengers", since).items():
+                added += self.add(r, ts, vals)
+        return added
+
+def build_profile_index(paths=None):
+    paths = paths or _paths()
+    idx = ProfileIndex(get_route_ids(), _source_info(paths))
+    for r in idx.routes:
+        df = _load_baseline(r)
+        ts = df["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        idx.add(r, ts, df[["signal", "landing", "loader"]].to_numpy(dtype=np.float64))
+    return idx
+
+def _open(paths, path=PROFILE_INDEX_PATH):
+    idx = None
+    if os.path.exists(path):
+        try:
+            idx = ProfileIndex.load(path)
+        except (OSError, ValueError, KeyError):
+            idx = None
+    if idx is None or idx.sources != _source_info(paths):
+        idx = build_profile_index(paths)
+        idx.save(path)
+    return idx
+
+def profile_index():
+    idx = dataset_cache.get("profile_index", _paths(), _open)
+    idx.refresh_live()
+    return idx
+
+def save_profile_index(path=PROFILE_INDEX_PATH):
+    idx = dataset_cache.peek("profile_index")
+    if idx is None or not idx.dirty:
+        return False
+    idx.save(path)
+    return True
@@ -0,0 +1,104 @@
+import json
+import time
+import threading
+from datetime import datetime, timezone, timedelta
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class RateLimited(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(f"{reason}: retry after {retry_after:.2f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+def _day(now):
+    return datetime.fromtimestamp(now, timezone.utc).strftime("%Y-%m-%d")
+
+def _until_midnight(now):
+    t = datetime.fromtimestamp(now, timezone.utc)
+    nxt = (t + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (nxt - t).total_seconds()
+
+class TokenBucket:
+    def __init__(self, qps, burst=None, daily_budget=0, path=None):
+        self.qps = float(qps)
+        self.burst = max(1.0, float(burst or qps or 1))
+        self.daily_budget = int(daily_budget or 0)
+        self.path = path if path and fcntl else None
+        self._lock = threading.Lock()
+        self._state = None
+
+    def _fresh(self, now):
+        return {"tokens": self.burst, "ts": now, "day": _day(now), "used": 0, "blocked_until": 0.0}
+
+    def _update(self, fn):
+        now = time.time()
+        with self._lock:
+            if not self.path:
+                if self._state is None:
+                    self._state = self._fresh(now)
+                return fn(self._state, now)
+            with open(self.path, "a+") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    try:
+                        state = json.loads(f.read() or "null") or self._fresh(now)
+                    except ValueError:
+                        state = self._fresh(now)
+                    out = fn(state, now)
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                    return out
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _take(self, state, now):
+        if self.qps > 0:
+            state["tokens"] = min(self.burst, state["tokens"] + max(0.0, now - state["ts"]) * self.qps)
+        else:
+            state["tokens"] = self.burst
+        state["ts"] = now
+        day = _day(now)
+        if state["day"] != day:
+            state["day"], state["used"] = day, 0
+        if self.daily_budget and state["used"] >= self.daily_budget:
+            return _until_midnight(now), "daily_budget"
+        if state["blocked_until"] > now:
+            return state["blocked_until"] - now, "backoff"
+        if state["tokens"] >= 1.0:
+            state["tokens"] -= 1.0
+            state["used"] += 1
+            return 0.0, None
+        return (1.0 - state["tokens"]) / self.qps, "qps"
+
+    def acquire(self, max_wait=0.0):
+        deadline = time.monotonic() + max(0.0, float(max_wait))
+        while True:
+            wait, reason = self._update(self._take)
+            if not reason:
+                return
+            if reason == "daily_budget" or time.monotonic() + wait > deadline:
+                raise RateLimited(reason, wait)
+            time.sleep(wait)
+
+    def block(self, seconds):
+        def fn(state, now):
+            state["blocked_until"] = max(state["blocked_until"], now + float(seconds))
+        self._update(fn)
+
+    def stats(self):
+        def fn(state, now):
+            return {
+                "qps": self.qps,
+                "daily_budget": self.daily_budget,
+                "used_today": state["used"] if state["day"] == _day(now) else 0,
+                "blocked_s": round(max(0.0, state["blocked_until"] - now), 3),
+                "backend": "file" if self.path else "memory",
+            }
+        return self._update(fn)
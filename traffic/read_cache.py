@@ -0,0 +1,128 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+READ_CACHE_TTL_S = float(os.getenv("DYNAMO_READ_CACHE_TTL_S", "60"))
+READ_CACHE_MAX_ENTRIES = int(os.getenv("DYNAMO_READ_CACHE_MAX_ENTRIES", "2048"))
+READ_CACHE_SHARED = os.getenv("DYNAMO_READ_CACHE_SHARED", "0") == "1"
+READ_CACHE_ALIAS = os.getenv("DYNAMO_READ_CACHE_ALIAS", "default")
+
+_MISSING = object()
+
+def _shared_backend(alias):
+    try:
+        from django.core.cache import caches
+        return caches[alias]
+    except Exception:
+        return None
+
+class ReadCache:
+    def __init__(self, ttl=READ_CACHE_TTL_S, max_entries=READ_CACHE_MAX_ENTRIES, shared=READ_CACHE_SHARED, alias=READ_CACHE_ALIAS):
+        self.ttl = float(ttl)
+        self.max_entries = max(1, int(max_entries))
+        self.shared = shared
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {}
+
+    def _backend(self):
+        return _shared_backend(self.alias) if self.shared else None
+
+    def _version(self, backend, route_id):
+        if backend is None:
+            return 0
+        try:
+            return backend.get(f"dynamo:v:{route_id}", 0)
+        except Exception:
+            return 0
+
+    def _record(self, method, kind, elapsed):
+        with self._lock:
+            s = self._stats.setdefault(method, {"hits": 0, "shared_hits": 0, "misses": 0, "hit_s": 0.0, "miss_s": 0.0})
+            s[kind] += 1
+            s["miss_s" if kind == "misses" else "hit_s"] += elapsed
+
+    def get_or_load(self, method, route_id, args, loader):
+        if self.ttl <= 0:
+            return loader()
+        t0 = time.perf_counter()
+        rid = str(route_id)
+        key = (method, rid) + tuple(args)
+        backend = self._backend()
+        version = self._version(backend, rid)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now and entry[1] == version:
+                self._entries.move_to_end(key)
+                value = entry[2]
+            else:
+                value = _MISSING
+        if value is not _MISSING:
+            self._record(method, "hits", time.perf_counter() - t0)
+            return value
+        skey = f"dynamo:{version}:{method}:{rid}:" + ":".join(str(a) for a in args)
+        if backend is not None:
+            try:
+                value = backend.get(skey, _MISSING)
+            except Exception:
+                value = _MISSING
+            if value is not _MISSING:
+                self._store(key, version, value)
+                self._record(method, "shared_hits", time.perf_counter() - t0)
+                return value
+        value = loader()
+        self._store(key, version, value)
+        if backend is not None:
+            try:
+                backend.set(skey, value, self.ttl)
+            except Exception:
+                pass
+        self._record(method, "misses", time.perf_counter() - t0)
+        return value
+
+    def _store(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, route_id):
+        rid = str(route_id)
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == rid]:
+                del self._entries[key]
+        backend = self._backend()
+        if backend is not None:
+            vkey = f"dynamo:v:{rid}"
+            try:
+                if not backend.add(vkey, 1, None):
+                    backend.incr(vkey)
+            except Exception:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            out = {}
+            for method, s in self._stats.items():
+                hits = s["hits"] + s["shared_hits"]
+                total = hits + s["misses"]
+                out[method] = {
+                    "hits": s["hits"],
+                    "shared_hits": s["shared_hits"],
+                    "misses": s["misses"],
+                    "hit_ratio": round(hits / total, 4) if total else 0.0,
+                    "avg_hit_ms": round(s["hit_s"] / hits * 1000, 3) if hits else 0.0,
+                    "avg_miss_ms": round(s["miss_s"] / s["misses"] * 1000, 3) if s["misses"] else 0.0,
+                }
+            out["entries"] = len(self._entries)
+            return out
+
+read_cache = ReadCache()
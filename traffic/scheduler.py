@@ -1,11 +1,21 @@
+import os
+import time
+import logging
 from datetime import datetime, timezone, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
 from .google_maps_client import GoogleMapsClient
 from .dynamo_repo import DynamoRepo
-from .ga import optimize_schedule
-from .prediction import train_and_predict_for_window, get_route_ids
+from .ga import optimize_fleet
+from .prediction import get_route_ids, dataset_stats
+from .profiles import save_profile_index, PROFILE_INDEX_SAVE_MINUTES
+from .workers import run_forecasts
 
+FLEET_BUS_BUDGET = os.getenv("FLEET_BUS_BUDGET", "")
+BUSES_PER_ROUTE = int(os.getenv("BUSES_PER_ROUTE", "6"))
+
+logger = logging.getLogger(__name__)
 scheduler = BackgroundScheduler()
+last_report = {}
 
 def traffic_job():
     repo = DynamoRepo()
@@ -13,39 +23,78 @@ def traffic_job():
     route_ids = get_route_ids()
     now = datetime.now(timezone.utc)
     window = 60
+    pairs = {}
     for rid in route_ids:
         mapping = repo.get_latest_route_mapping(rid)
         if mapping and mapping.get("origin") and mapping.get("destination"):
-            eta = gm.get_route_eta(mapping["origin"], mapping["destination"])
-            if eta:
-                repo.put_snapshot({
-                    "route_id": str(rid),
-                    "timestamp_iso": now.isoformat(),
-                    "distance_m": eta.distance_meters or 0,
-                    "duration_s": eta.duration_seconds or 0,
-                    "duration_in_traffic_s": eta.duration_in_traffic_seconds or 0,
-                    "source": "google_maps",
-                })
-    for rid in route_ids:
-        preds = train_and_predict_for_window(rid, now, window)
-        for i, delay in enumerate(preds):
-            repo.put_prediction({
-                "route_id": str(rid),
-                "timestamp_iso": (now + timedelta(minutes=i)).isoformat(),
-                "predicted_delay_sec": int(delay),
-                "model_version": "rf_v1",
-            })
-        ga = optimize_schedule(num_buses=6, window_minutes=window, predicted_delays=preds)
+            pairs[str(rid)] = (mapping["origin"], mapping["destination"])
+    t_eta = time.perf_counter()
+    etas = gm.get_route_etas(pairs.values())
+    snap_items = [eta.snapshot_item(rid, now.isoformat()) for rid, eta in zip(pairs, etas) if eta]
+    snaps = repo.put_snapshots_bulk(snap_items)
+    fetched = sum(1 for eta in etas if eta)
+    logger.info("traffic_job fetched %d/%d etas in %.3fs", fetched, len(pairs), time.perf_counter() - t_eta)
+    t0 = time.perf_counter()
+    results = run_forecasts(route_ids, window)
+    timings = {}
+    forecasts = {}
+    items = []
+    for r in results:
+        rid = r["route_id"]
+        timings[rid] = {"fit_s": r["fit_s"], "forecast_s": r["forecast_s"], "update": r["update"], "error": r["error"]}
+        if r["error"]:
+            logger.warning("traffic_job route %s failed: %s", rid, r["error"])
+            continue
+        preds = r["preds"]
+        items.extend({
+            "route_id": rid,
+            "timestamp_iso": (now + timedelta(minutes=i)).isoformat(),
+            "predicted_delay_sec": int(delay),
+            "model_version": r["version"],
+        } for i, delay in enumerate(preds))
+        forecasts[rid] = preds
+    writes = repo.put_predictions_bulk(items)
+    if writes["failed"]:
+        logger.warning("traffic_job failed to write %d predictions", writes["failed"])
+    budget = int(FLEET_BUS_BUDGET) if FLEET_BUS_BUDGET else None
+    previous = {rid: repo.get_latest_schedule(rid) for rid in forecasts}
+    schedules = optimize_fleet(forecasts, window, bus_budget=budget, num_buses=BUSES_PER_ROUTE, previous=previous, now=now)
+    for rid, ga in schedules.items():
         repo.put_schedule({
-            "route_id": str(rid),
+            "route_id": rid,
             "timestamp_iso": now.isoformat(),
             "departures_minutes": ga["departures_minutes"],
             "fitness": ga["fitness"],
+            "generations": ga["generations"],
+            "converged": ga["converged"],
         })
+    for rid, t in timings.items():
+        logger.info("traffic_job route %s fit=%.3fs (%s) forecast=%.3fs", rid, t["fit_s"], t["update"], t["forecast_s"])
+    datasets = dataset_stats()
+    logger.info("traffic_job dataset cache: %s", datasets)
+    reads = repo.cache_stats()
+    logger.info("traffic_job dynamo read cache: %s", reads)
+    last_report.clear()
+    ga_stats = next(iter(schedules.values()), {})
+    last_report.update({
+        "started": now.isoformat(),
+        "etas_fetched": fetched,
+        "snapshots_written": snaps["written"],
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+        "predictions_written": writes["written"],
+        "predictions_failed": writes["failed"],
+        "ga_generations": ga_stats.get("generations", 0),
+        "ga_converged": ga_stats.get("converged", False),
+        "routes": timings,
+        "dataset_cache": datasets,
+        "read_cache": reads,
+    })
+    return last_report
 
 def start_scheduler():
     try:
         scheduler.add_job(traffic_job, "interval", minutes=5, id="traffic_job", replace_existing=True)
+        scheduler.add_job(save_profile_index, "interval", minutes=PROFILE_INDEX_SAVE_MINUTES, id="profile_index_save", replace_existing=True)
         scheduler.start()
     except Exception:
         pass
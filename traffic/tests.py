@@ -0,0 +1,112 @@
+import os
+import time
+import tempfile
+import threading
+from unittest import mock
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+from .features import FEATURES
+from .forecast import forecast_batch
+from .live_store import LiveStore
+from .prediction import FittedModel, fleet_features, get_route_ids, _features, _load_baseline
+from .profiles import ProfileIndex
+
+class SlowLiveStore(LiveStore):
+    def rows_since(self, kind, since):
+        rows = super().rows_since(kind, since)
+        time.sleep(0.05)
+        return rows
+
+def _run(threads, fn):
+    barrier = threading.Barrier(threads)
+    errors = []
+    def work():
+        barrier.wait()
+        try:
+            fn()
+        except Exception as e:
+            errors.append(e)
+    ts = [threading.Thread(target=work) for _ in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return errors
+
+class ProfileIndexConcurrencyTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.store = SlowLiveStore(os.path.join(self.dir.name, "live"))
+        now = pd.Timestamp.now(tz="UTC").floor("h")
+        self.store.append("passengers", [("10001", now, [5, 1, 2])])
+
+    def test_concurrent_refresh_counts_live_rows_once(self):
+        idx = ProfileIndex(["10001"])
+        with mock.patch("traffic.profiles.live_store", self.store):
+            errors = _run(4, idx.refresh_live)
+        self.assertEqual(errors, [])
+        self.assertEqual(int(idx.count[0, 0].sum()), 1)
+
+    def test_concurrent_save_keeps_a_loadable_index(self):
+        idx = ProfileIndex(["10001"])
+        with mock.patch("traffic.profiles.live_store", self.store):
+            idx.refresh_live()
+        path = os.path.join(self.dir.name, "profiles", "hour_of_week.npz")
+        errors = _run(4, lambda: idx.save(path))
+        self.assertEqual(errors, [])
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["hour_of_week.npz"])
+        self.assertEqual(int(ProfileIndex.load(path).count[0, 0].sum()), 1)
+        self.assertFalse(idx.dirty)
+
+class ProfileQuantileTests(SimpleTestCase):
+    def test_quantiles_stay_within_observed_values(self):
+        idx = ProfileIndex(["10001"])
+        ts = np.arange(12) * 60 * 10**9
+        idx.add("10001", ts, np.zeros((12, 3)))
+        e = idx.expected("10001", 0)
+        self.assertEqual((e["mean"], e["p10"], e["p50"], e["p90"]), (0.0, 0.0, 0.0, 0.0))
+        idx.add("10001", ts, np.full((12, 3), 7.0))
+        e = idx.expected("10001", 0)
+        self.assertEqual(e["p10"], 0.0)
+        self.assertLessEqual(e["p90"], 7.0)
+
+class ForecastBatchTests(SimpleTestCase):
+    def _loop(self, model, last, window_minutes):
+        hour, weekday, month, lag1, lag2, roll, landing, loader = (float(v) for v in last)
+        preds = []
+        for _ in range(window_minutes):
+            yhat = float(model.predict(np.array([[hour, weekday, month, lag1, lag2, roll, landing, loader]]))[0])
+            preds.append(max(0.0, yhat))
+            lag2, lag1 = lag1, roll
+            roll = (roll * 2 + yhat / 10.0) / 3.0
+            hour = (hour + 1 / 60.0) % 24
+            landing = max(0.0, landing * 0.95)
+            loader = max(0.0, loader * 0.95)
+        return np.array(preds)
+
+    def test_forecast_batch_matches_per_minute_predict_loop(self):
+        fleet = fleet_features()
+        fitted = []
+        for r in get_route_ids()[:3]:
+            X, y = fleet.matrix(r), fleet.target(r)
+            fitted.append(FittedModel(RandomForestRegressor(n_estimators=20, random_state=0).fit(X, y), None, X[-1]))
+            fitted.append(FittedModel(Ridge().fit(X, y), None, X[-1]))
+        batch = forecast_batch(fitted, 60)
+        for f, preds in zip(fitted, batch):
+            expected = self._loop(f.model, f.last, 60)
+            if isinstance(f.model, RandomForestRegressor):
+                self.assertTrue(np.array_equal(preds, expected))
+            else:
+                np.testing.assert_allclose(preds, expected, rtol=1e-9, atol=1e-9)
+
+class FleetFeaturesTests(SimpleTestCase):
+    def test_matrix_and_target_match_per_route_features(self):
+        fleet = fleet_features()
+        for r in get_route_ids():
+            X = _features(_load_baseline(r))
+            self.assertTrue(np.array_equal(fleet.matrix(r), X[FEATURES].values), r)
+            self.assertTrue(np.array_equal(fleet.target(r), (X["mix"] * 10.0).values), r)
@@ -1,12 +1,18 @@
+import os
 from django.urls import path
-from . import views, auth_views
+from . import views, auth_views, async_views
+
+read = async_views if os.getenv("ASYNC_VIEWS", "0") == "1" else views
 
 urlpatterns = [
-    path("api/health/", views.health),
+    path("api/health/", read.health),
     path("api/routes/", views.routes),
-    path("api/eta/", views.eta),
-    path("api/predictions/", views.predictions),
-    path("api/schedule/", views.schedule),
+    path("api/routes/overview/", views.routes_overview),
+    path("api/routes/profile/", views.route_profile),
+    path("api/eta/", read.eta),
+    path("api/predictions/", read.predictions),
+    path("api/snapshots/", views.snapshots),
+    path("api/schedule/", read.schedule),
     path("api/operator/routes/", views.operator_push_routes),
 
     # Auth endpoints
@@ -17,6 +23,6 @@ urlpatterns = [
     path("api/auth/mfa/disable/", auth_views.mfa_disable),
 
     # New endpoints
-    path("api/route-mapping/", views.get_route_mapping),
-    path("api/passengers/", views.passenger_predictions),
+    path("api/route-mapping/", read.get_route_mapping),
+    path("api/passengers/", read.passenger_predictions),
 ]
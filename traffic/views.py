@@ -1,13 +1,19 @@
 import os
-import pandas as pd
+import json
+from itertools import islice
 from datetime import datetime, timezone
-from django.conf import settings
-from django.http import JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from .google_maps_client import GoogleMapsClient
+from .rate_limit import RateLimited
+from .eta_cache import eta_cache
+from .eta_service import latest_eta
 from .dynamo_repo import DynamoRepo
 
+OVERVIEW_MAX_ROUTES = int(os.getenv("OVERVIEW_MAX_ROUTES", "100"))
+
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def health(request):
@@ -16,27 +22,62 @@ def health(request):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def routes(request):
-    data_dir = os.path.join(settings.BASE_DIR, "traffic", "data")
-    route_ids = set()
-    for file in os.listdir(data_dir):
-        if file.endswith(".csv"):
-            p = os.path.join(data_dir, file)
-            try:
-                df = pd.read_csv(p)
-                route_ids.update(df.columns[1:])
-            except Exception:
-                pass
-    return JsonResponse({"routes": sorted(list(route_ids))})
+    from .prediction import route_catalog
+    catalog = route_catalog()
+    etag = f'"{catalog["etag"]}"'
+    if etag in request.headers.get("If-None-Match", ""):
+        resp = HttpResponse(status=304)
+    else:
+        resp = JsonResponse({"routes": catalog["routes"]})
+    resp["ETag"] = etag
+    resp["Cache-Control"] = "private, no-cache"
+    return resp
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
-def eta(request):
+def route_profile(request):
+    from .profiles import profile_index, KINDS
+    from .passenger_series import parse_since
+    rid = request.GET.get("route_id")
+    kind = request.GET.get("kind", "boarding")
+    if not rid:
+        return JsonResponse({"error": "route_id required"}, status=400)
+    if kind not in KINDS:
+        return JsonResponse({"error": f"kind must be one of {', '.join(KINDS)}"}, status=400)
+    idx = profile_index()
+    if not idx.has(rid):
+        return JsonResponse({"error": "unknown route"}, status=404)
+    at = request.GET.get("at")
+    if not at:
+        return JsonResponse(dict(idx.profile(rid, kind), route_id=rid, kind=kind))
+    try:
+        ts = parse_since(at)
+    except ValueError:
+        return JsonResponse({"error": "invalid at"}, status=400)
+    return JsonResponse(dict(idx.expected(rid, ts, kind), route_id=rid, kind=kind, at=at))
+
+def eta_response(request):
+    rid = request.GET.get("route_id")
+    if rid:
+        e = latest_eta(rid)
+        if e is None:
+            return JsonResponse({"error": "no mapping found"}, status=404)
+        if not e["available"]:
+            resp = JsonResponse(dict(e, error="no recent snapshot"), status=503)
+            resp["Retry-After"] = "5"
+            return resp
+        return JsonResponse(e)
     origin = request.GET.get("origin")
     destination = request.GET.get("destination")
     if not origin or not destination:
-        return JsonResponse({"error": "origin and destination are required"}, status=400)
+        return JsonResponse({"error": "route_id or origin and destination are required"}, status=400)
     gm = GoogleMapsClient()
-    e = gm.get_route_eta(origin, destination)
+    try:
+        e, age = eta_cache.get_or_fetch(origin, destination, lambda: gm.get_route_eta(origin, destination))
+    except RateLimited as rl:
+        resp = JsonResponse({"error": "rate limited", "reason": rl.reason, "retry_after_s": round(rl.retry_after, 2)}, status=429)
+        resp["Retry-After"] = str(max(1, int(rl.retry_after + 0.999)))
+        return resp
     if not e:
         return JsonResponse({"error": "no route found"}, status=404)
     return JsonResponse({
@@ -45,21 +86,82 @@ def eta(request):
         "distance_m": e.distance_meters,
         "duration_s": e.duration_seconds,
         "duration_in_traffic_s": e.duration_in_traffic_seconds,
+        "cached": age > 0,
+        "age_s": round(age, 3),
     })
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
-def predictions(request):
+def eta(request):
+    return eta_response(request)
+
+def _query_args(request, default_limit):
+    fields = [f for f in request.GET.get("fields", "").split(",") if f]
+    try:
+        limit = int(request.GET.get("limit", default_limit))
+    except ValueError:
+        limit = default_limit
+    return {
+        "start": request.GET.get("start") or None,
+        "end": request.GET.get("end") or None,
+        "fields": fields or None,
+    }, max(0, limit)
+
+def _stream(key, rid, items, stats):
+    yield '{"route_id": %s, "%s": [' % (json.dumps(rid), key)
+    for i, it in enumerate(items):
+        yield ("," if i else "") + json.dumps(it, cls=DjangoJSONEncoder)
+    yield '], "consumed_capacity": %s, "pages": %d}' % (json.dumps(stats.get("consumed_capacity", 0.0)), stats.get("pages", 0))
+
+def _history(request, key, default_limit, get_items, iter_items):
     rid = request.GET.get("route_id")
     if not rid:
         return JsonResponse({"error": "route_id required"}, status=400)
+    kw, limit = _query_args(request, default_limit)
+    stats = {}
+    if request.GET.get("stream") == "1":
+        items = iter_items(rid, page_size=limit or None, stats=stats, **kw)
+        if limit:
+            items = islice(items, limit)
+        return StreamingHttpResponse(_stream(key, rid, items, stats), content_type="application/json")
+    if not limit:
+        return JsonResponse({"error": "limit must be positive; use stream=1 for unbounded reads"}, status=400)
+    items = get_items(rid, limit=limit, stats=stats, **kw)
+    resp = JsonResponse({"route_id": rid, key: items})
+    resp["X-Consumed-Capacity"] = str(stats.get("consumed_capacity", 0.0))
+    return resp
+
+def predictions_response(request):
     repo = DynamoRepo()
-    items = repo.get_predictions_by_route(rid, limit=120)
-    return JsonResponse({"route_id": rid, "predictions": items})
+    return _history(request, "predictions", 120, repo.get_predictions_by_route, repo.iter_predictions_by_route)
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
-def schedule(request):
+def predictions(request):
+    return predictions_response(request)
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def snapshots(request):
+    repo = DynamoRepo()
+    return _history(request, "snapshots", 100, repo.get_snapshots_by_route, repo.iter_snapshots_by_route)
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def routes_overview(request):
+    rids = [r for r in request.GET.get("route_ids", "").split(",") if r]
+    if not rids:
+        return JsonResponse({"error": "route_ids required"}, status=400)
+    if len(rids) > OVERVIEW_MAX_ROUTES:
+        return JsonResponse({"error": f"at most {OVERVIEW_MAX_ROUTES} route_ids"}, status=400)
+    try:
+        window = min(max(1, int(request.GET.get("window", 60))), 240)
+    except ValueError:
+        window = 60
+    repo = DynamoRepo()
+    return JsonResponse({"window": window, "routes": repo.get_routes_overview(rids, window)})
+
+def schedule_response(request):
     rid = request.GET.get("route_id")
     if not rid:
         return JsonResponse({"error": "route_id required"}, status=400)
@@ -69,10 +171,13 @@ def schedule(request):
         return JsonResponse({"error": "no schedule"}, status=404)
     return JsonResponse(item)
 
-# ✅ new route mapping endpoint
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
-def get_route_mapping(request):
+def schedule(request):
+    return schedule_response(request)
+
+# ✅ new route mapping endpoint
+def route_mapping_response(request):
     rid = request.GET.get("route_id")
     if not rid:
         return JsonResponse({"error": "route_id required"}, status=400)
@@ -84,23 +189,30 @@ def get_route_mapping(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
-def passenger_predictions(request):
-    from .prediction import load_historical_for_route
+def get_route_mapping(request):
+    return route_mapping_response(request)
+
+def passengers_response(request):
+    from .passenger_series import passenger_series, parse_since, PASSENGER_SERIES_ROWS
     rid = request.GET.get("route_id")
     if not rid:
         return JsonResponse({"error": "route_id required"}, status=400)
-    
-    df = load_historical_for_route(rid)
-    recent = df.tail(60).to_dict('records')
-
-    data = [{
-        'timestamp': r['timestamp'].isoformat() if hasattr(r['timestamp'], 'isoformat') else str(r['timestamp']),
-        'boarding': int(r.get('signal', 0)),
-        'landing': int(r.get('landing', 0)),
-        'loader': int(r.get('loader', 0))
-    } for r in recent]
-    
-    return JsonResponse({"route_id": rid, "passenger_data": data})
+    try:
+        since = parse_since(request.GET.get("since"))
+        limit = min(max(0, int(request.GET.get("limit", 60))), PASSENGER_SERIES_ROWS)
+    except ValueError:
+        return JsonResponse({"error": "invalid since or limit"}, status=400)
+    route = passenger_series().route(rid)
+    if route is None:
+        return JsonResponse({"error": "unknown route"}, status=404)
+    series = route.window(since, limit)
+    ts = series["timestamp"]
+    return JsonResponse({"route_id": rid, "count": len(ts), "last": ts[-1] if ts else None, "passenger_series": series})
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def passenger_predictions(request):
+    return passengers_response(request)
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
@@ -109,11 +221,10 @@ def operator_push_routes(request):
     routes = payload.get("routes", {})
     now = datetime.now(timezone.utc).isoformat()
     repo = DynamoRepo()
-    for rid, pair in routes.items():
-        repo.append_history({
-            "route_id": str(rid),
-            "timestamp_iso": now,
-            "origin": pair[0],
-            "destination": pair[1],
-        })
-    return JsonResponse({"ok": True, "count": len(routes)})
+    res = repo.append_history_bulk({
+        "route_id": str(rid),
+        "timestamp_iso": now,
+        "origin": pair[0],
+        "destination": pair[1],
+    } for rid, pair in routes.items())
+    return JsonResponse({"ok": res["failed"] == 0, "count": len(routes), "written": res["written"], "failed": res["failed"]})
@@ -0,0 +1,139 @@
+import os
+import time
+import zlib
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .forecast import forecast_batch
+from .prediction import fit_route_model, export_dataset, attach_dataset, _paths
+
+TRAFFIC_JOB_WORKERS = int(os.getenv("TRAFFIC_JOB_WORKERS", "0"))
+TRAFFIC_JOB_START_METHOD = os.getenv("TRAFFIC_JOB_START_METHOD", "spawn")
+
+_worker_shm = None
+
+def _init_worker(meta):
+    global _worker_shm
+    if meta:
+        _worker_shm = attach_dataset(meta)
+
+def _result(rid, **kw):
+    out = {"route_id": str(rid), "preds": None, "version": None, "update": None, "fit_s": 0.0, "forecast_s": 0.0, "error": None}
+    out.update(kw)
+    return out
+
+def forecast_routes(route_ids, window):
+    results = {}
+    ok, fitted = [], []
+    for rid in route_ids:
+        t0 = time.perf_counter()
+        try:
+            fitted.append(fit_route_model(rid))
+            ok.append(rid)
+            results[rid] = _result(rid)
+        except Exception as e:
+            results[rid] = _result(rid, error=repr(e))
+        results[rid]["fit_s"] = round(time.perf_counter() - t0, 4)
+    t0 = time.perf_counter()
+    try:
+        forecasts = forecast_batch(fitted, window)
+        share = round((time.perf_counter() - t0) / max(1, len(ok)), 4)
+        for rid, f, preds in zip(ok, fitted, forecasts):
+            results[rid].update(preds=preds, version=f.version, update=f.update, forecast_s=share)
+    except Exception:
+        for rid, f in zip(ok, fitted):
+            t1 = time.perf_counter()
+            try:
+                results[rid].update(preds=forecast_batch([f], window)[0], version=f.version, update=f.update)
+            except Exception as e:
+                results[rid]["error"] = repr(e)
+            results[rid]["forecast_s"] = round(time.perf_counter() - t1, 4)
+    return [results[rid] for rid in route_ids]
+
+def _data_signature():
+    sig = []
+    for p in _paths():
+        st = os.stat(p)
+        sig.append((p, st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+class ForecastPool:
+    def __init__(self, workers, start_method=TRAFFIC_JOB_START_METHOD):
+        self.workers = max(1, int(workers))
+        self._ctx = multiprocessing.get_context(start_method)
+        self._lock = threading.Lock()
+        self._pools = []
+        self._shm = None
+        self._meta = None
+        self._sig = None
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=1, mp_context=self._ctx, initializer=_init_worker, initargs=(self._meta,))
+
+    def _ensure(self):
+        sig = _data_signature()
+        if self._pools and sig == self._sig:
+            return
+        self._close()
+        self._shm, self._meta = export_dataset()
+        self._sig = sig
+        self._pools = [self._new_pool() for _ in range(self.workers)]
+
+    def _close(self):
+        for pool in self._pools:
+            pool.shutdown(wait=True, cancel_futures=True)
+        self._pools = []
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def run(self, route_ids, window):
+        route_ids = [str(r) for r in route_ids]
+        with self._lock:
+            self._ensure()
+            chunks = [[] for _ in self._pools]
+            for rid in route_ids:
+                chunks[zlib.crc32(rid.encode("utf-8")) % len(chunks)].append(rid)
+            futures = [(i, chunk, self._pools[i].submit(forecast_routes, chunk, window)) for i, chunk in enumerate(chunks) if chunk]
+            results = {}
+            for i, chunk, fut in futures:
+                try:
+                    for r in fut.result():
+                        results[r["route_id"]] = r
+                except Exception as e:
+                    for rid in chunk:
+                        results[rid] = _result(rid, error=repr(e))
+                    if isinstance(e, BrokenProcessPool):
+                        self._pools[i] = self._new_pool()
+            return [results[rid] for rid in route_ids]
+
+    def shutdown(self):
+        with self._lock:
+            self._close()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def run_forecasts(route_ids, window, workers=TRAFFIC_JOB_WORKERS):
+    global _pool
+    if workers <= 1:
+        return forecast_routes([str(r) for r in route_ids], window)
+    with _pool_lock:
+        if _pool is None or _pool.workers != workers:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = ForecastPool(workers)
+        pool = _pool
+    return pool.run(route_ids, window)
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+atexit.register(shutdown_pool)
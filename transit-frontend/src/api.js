@@ -24,6 +24,15 @@ export async function getRoutes(token) {
   return res.json(); // { routes: [...] }
 }
 
+export async function getRoutesOverview(routeIds, token, window = 60) {
+  const qs = new URLSearchParams({ route_ids: routeIds.join(','), window }).toString();
+  const res = await fetch(`${API_BASE}/api/routes/overview/?${qs}`, {
+    headers: { 'Authorization': `Bearer ${token}` }
+  });
+  if (!res.ok) throw new Error('Failed to fetch routes overview');
+  return res.json(); // { window, routes: { [routeId]: { schedule, mapping, predictions } } }
+}
+
 export async function getPredictions(routeId, token) {
   const res = await fetch(`${API_BASE}/api/predictions/?route_id=${encodeURIComponent(routeId)}`, {
     headers: { 'Authorization': `Bearer ${token}` }
@@ -73,10 +82,22 @@ export async function getETA(origin, destination, token) {
   if (!res.ok) throw new Error('Failed to fetch ETA');
   return res.json();
 }
-export async function getPassengerData(routeId, token) {
-  const res = await fetch(`${API_BASE}/api/passengers/?route_id=${encodeURIComponent(routeId)}`, {
+export async function getPassengerData(routeId, token, { since, limit } = {}) {
+  const qs = new URLSearchParams({ route_id: routeId });
+  if (since) qs.set('since', since);
+  if (limit) qs.set('limit', limit);
+  const res = await fetch(`${API_BASE}/api/passengers/?${qs.toString()}`, {
     headers: { 'Authorization': `Bearer ${token}` }
   });
   if (!res.ok) throw new Error('Failed to fetch passenger data');
-  return res.json();
+  return res.json(); // { route_id, count, last, passenger_series: { timestamp: [...], boarding: [...], landing: [...], loader: [...] } }
+}
+
+export function passengerRows(series) {
+  return (series?.timestamp || []).map((timestamp, i) => ({
+    timestamp,
+    boarding: series.boarding[i],
+    landing: series.landing[i],
+    loader: series.loader[i]
+  }));
 }
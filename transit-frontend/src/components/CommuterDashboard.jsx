@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { getRoutes, getSchedule, getRouteMapping, getETA } from '../api';
+import { getRoutes, getRoutesOverview, getETA } from '../api';
 import RouteMap from './RouteMap';
 
 function CommuterDashboard({ token }) {
@@ -21,10 +21,12 @@ function CommuterDashboard({ token }) {
   useEffect(() => {
     if (!routeId) return;
     (async () => {
-      const s = await getSchedule(routeId, token).catch(()=>null);
-      setSched(s && !s.error ? s : null);
+      const o = await getRoutesOverview([routeId], token).catch(()=>null);
+      const r = o?.routes?.[routeId] || {};
+      const s = r.schedule || null;
+      setSched(s);
       // next bus text
-      if (s && !s.error && Array.isArray(s.departures_minutes)) {
+      if (s && Array.isArray(s.departures_minutes)) {
         const t0 = new Date(s.timestamp_iso);
         const now = new Date();
         const diffMin = (now - t0) / 60000;
@@ -38,7 +40,7 @@ function CommuterDashboard({ token }) {
       } else setNextBusText('No schedule available.');
 
       // mapping + ETA
-      const mi = await getRouteMapping(routeId, token).catch(()=>null);
+      const mi = r.mapping || null;
       setMapInfo(mi);
       if (mi?.origin && mi?.destination) {
         const e = await getETA(mi.origin, mi.destination, token).catch(()=>null);
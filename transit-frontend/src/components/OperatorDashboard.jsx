@@ -1,6 +1,6 @@
 import React, { useEffect, useMemo, useState } from 'react';
 import { ResponsiveContainer, LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip } from 'recharts';
-import { getRoutes, getPredictions, getSchedule, getRouteMapping, getETA, pushRouteMapping, getPassengerData } from '../api';
+import { getRoutes, getRoutesOverview, getRouteMapping, getETA, pushRouteMapping, getPassengerData, passengerRows } from '../api';
 
 function OperatorDashboard({ token }) {
   const [routes, setRoutes] = useState([]);
@@ -26,30 +26,21 @@ function OperatorDashboard({ token }) {
     if (!routeId) return;
     (async () => {
       setMsg('');
-      try {
-        const [p, s] = await Promise.all([
-          getPredictions(routeId, token).catch(()=>null),
-          getSchedule(routeId, token).catch(()=>null)
-        ]);
-        const sorted = (p?.predictions || []).slice().sort((a,b)=>new Date(a.timestamp_iso)-new Date(b.timestamp_iso));
-        setPred(sorted);
-        setSched(s && !s.error ? s : null);
-      } catch {}
-      const passengerData = await getPassengerData(routeId, token).catch(()=>null);
-      if (passengerData?.passenger_data) setPassengers(passengerData.passenger_data);
-      try {
-        const mi = await getRouteMapping(routeId, token);
-        setMapInfo(mi);
-        setOrigin(mi.origin || '');
-        setDestination(mi.destination || '');
-        if (mi.origin && mi.destination) {
-          const e = await getETA(mi.origin, mi.destination, token);
-          setEta(e);
-        } else setEta(null);
-      } catch {
-        setMapInfo(null);
-        setEta(null);
-      }
+      const o = await getRoutesOverview([routeId], token).catch(()=>null);
+      const r = o?.routes?.[routeId] || {};
+      const p = r.predictions || {};
+      setPred((p.timestamps || []).map((ts, i) => ({ timestamp_iso: ts, predicted_delay_sec: (p.delays_sec || [])[i] })));
+      setSched(r.schedule || null);
+      const passengerData = await getPassengerData(routeId, token, { limit: 20 }).catch(()=>null);
+      if (passengerData?.passenger_series) setPassengers(passengerRows(passengerData.passenger_series));
+      const mi = r.mapping || null;
+      setMapInfo(mi);
+      setOrigin(mi?.origin || '');
+      setDestination(mi?.destination || '');
+      if (mi?.origin && mi?.destination) {
+        const e = await getETA(mi.origin, mi.destination, token).catch(()=>null);
+        setEta(e);
+      } else setEta(null);
     })();
   }, [routeId, token]);
 